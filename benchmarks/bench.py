@@ -0,0 +1,354 @@
+"""Headless benchmark suite for Ninja Contra.
+
+Runs seeded, scripted scenarios on the SDL dummy drivers and writes per-phase
+frame timings and memory figures as JSON:
+
+    python benchmarks/bench.py run --output results.json
+    python benchmarks/bench.py compare baseline.json results.json
+
+Each scenario runs in its own process, once for timings and once under
+tracemalloc for memory, so neither measurement disturbs the other and
+startup is always measured cold.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # Asset paths are relative to the game directory
+
+SEED = 1234
+FRAMES = 600
+THRESHOLD = 0.10  # Relative slowdown that counts as a regression
+NOISE_MS = 0.05  # Differences below this are timer noise, never regressions
+
+
+class PhaseTimer:
+    """Collects per-frame milliseconds for named phases"""
+    def __init__(self):
+        self.samples = {}
+        self.current = {}
+        self.within = {}  # Nested phase -> enclosing phase
+
+    def wrap(self, owner, name, phase, within=None):
+        """Replace owner.name with a version that adds its run time to phase.
+
+        A phase nested inside another (collisions inside update) is
+        subtracted from it, so each phase only counts its own time.
+        """
+        if within:
+            self.within[phase] = within
+        func = getattr(owner, name)
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current[phase] = current.get(phase, 0.0) + (time.perf_counter() - start) * 1000
+        setattr(owner, name, timed)
+        return func
+
+    def end_frame(self):
+        current = self.current
+        for phase, outer in self.within.items():
+            if phase in current and outer in current:
+                current[outer] -= current[phase]
+        for phase, ms in current.items():
+            self.samples.setdefault(phase, []).append(ms)
+        current.clear()
+
+
+def instrument_game(game, timer):
+    import pygame
+    timer.wrap(game, 'update', 'update')
+    timer.wrap(game, 'check_collisions', 'collisions', within='update')
+    timer.wrap(game, 'draw', 'draw')
+    timer.wrap(pygame.display, 'flip', 'flip', within='draw')
+    timer.wrap(pygame.display, 'update', 'flip', within='draw')
+
+
+def run_game(game, frames, timer, before_step=None):
+    from main import gc_monitor
+    for frame in range(frames):
+        if before_step:
+            before_step(game, frame)
+        paused = gc_monitor.pause_ms
+        game.step()
+        game.draw()
+        # Collector pauses happen inside the other phases; reported alongside, not subtracted
+        timer.current['gc'] = gc_monitor.pause_ms - paused
+        timer.end_frame()
+
+
+# Scenarios: each takes a frame count and a PhaseTimer
+
+def scenario_level1_idle(frames, timer):
+    """Level 1, player standing still at the start"""
+    import main
+    game = main.Game(1, main.ScriptedInput(), main.create_screen(), SEED)
+    instrument_game(game, timer)
+    run_game(game, frames, timer)
+
+
+def scenario_level5_spread(frames, timer):
+    """Level 5 with the spread weapon firing every time it is ready"""
+    import main, pygame
+    controls = main.ScriptedInput()
+    game = main.Game(1, controls, main.create_screen(), SEED)
+    for _ in range(4):
+        game.next_level()
+    game.player.lives = 99  # Keep the scenario running to the end
+
+    def fire(game, frame):
+        game.player.weapon = 'spread'
+        controls.press(pygame.K_z)
+        if frame % 120 == 0:
+            controls.release(pygame.K_LEFT if frame % 240 else pygame.K_RIGHT)
+            controls.hold(pygame.K_RIGHT if frame % 240 else pygame.K_LEFT)
+    instrument_game(game, timer)
+    run_game(game, frames, timer, fire)
+
+
+def scenario_long_level(frames, timer):
+    """A 12000 px level with 200 zombies, player running right"""
+    import main, pygame
+    controls = main.ScriptedInput()
+    controls.hold(pygame.K_RIGHT)
+    game = main.Game(1, controls, main.create_screen(), SEED)
+    level = game.level
+    level.width = 12000
+    while len(level.enemies) < 200:
+        x = game.rng.randint(400, level.width - 100)
+        y = game.rng.choice([main.SCREEN_HEIGHT - 90, 260, 330, 410])
+        level.enemies.add(main.Enemy(x, y, game.rng.choice(['soldier', 'heavy', 'turret']), game.rng))
+    game.camera = main.Camera(level.width, main.SCREEN_HEIGHT)
+    game.background = main.Background(level.width, level.theme, game.rng)
+    game.world = main.WorldLayer(level)
+    game.player.lives = 99
+
+    def jump(game, frame):
+        if frame % 45 == 0:
+            controls.press(pygame.K_SPACE)
+        controls.press(pygame.K_z)
+    instrument_game(game, timer)
+    run_game(game, frames, timer, jump)
+
+
+def scenario_horde(frames, timer):
+    """Horde mode: 5000 array-backed zombies, player running right with rapid fire"""
+    import main, pygame
+    controls = main.ScriptedInput()
+    controls.hold(pygame.K_RIGHT)
+    game = main.Game(1, controls, main.create_screen(), SEED, horde=True)
+    game.player.lives = 99
+    game.player.weapon = 'rapid'
+
+    def fire(game, frame):
+        if frame % 6 == 0:
+            controls.press(pygame.K_z)
+    instrument_game(game, timer)
+    run_game(game, frames, timer, fire)
+
+
+def scenario_menu_idle(frames, timer):
+    """Main menu with nothing pressed"""
+    import main, pygame
+    menu = main.MainMenu(main.create_screen())
+    timer.wrap(menu, 'draw', 'draw')
+    timer.wrap(pygame.display, 'flip', 'flip', within='draw')
+    for _ in range(frames):
+        menu.draw()
+        timer.end_frame()
+
+
+def scenario_startup(frames, timer):
+    """Cold import, window, menu and first level with all their assets"""
+    def phase(name, func):
+        start = time.perf_counter()
+        result = func()
+        timer.current[name] = (time.perf_counter() - start) * 1000
+        return result
+
+    main = phase('import', lambda: __import__('main'))
+    screen = phase('display', main.create_screen)
+    phase('menu', lambda: main.MainMenu(screen))
+    phase('game', lambda: main.Game(1, main.ScriptedInput(), screen, SEED))
+    timer.end_frame()
+
+
+SCENARIOS = {
+    'level1_idle': scenario_level1_idle,
+    'level5_spread': scenario_level5_spread,
+    'long_level_200': scenario_long_level,
+    'horde_5000': scenario_horde,
+    'menu_idle': scenario_menu_idle,
+    'startup': scenario_startup,
+}
+
+
+def percentile(sorted_samples, fraction):
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'mean_ms': sum(ordered) / len(ordered),
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'max_ms': ordered[-1],
+        'total_ms': sum(ordered),
+    }
+
+
+def measure(name, frames, memory):
+    """Run one scenario in this process and return its results"""
+    timer = PhaseTimer()
+    if not memory:
+        SCENARIOS[name](frames, timer)
+        return {'frames': frames, 'phases': {phase: summarize(samples)
+                                              for phase, samples in timer.samples.items()}}
+
+    gc.collect()
+    collections = [stats['collections'] for stats in gc.get_stats()]
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    SCENARIOS[name](frames, timer)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        'peak_kb': peak / 1024,
+        'retained_kb': current / 1024,
+        'allocated_blocks': sys.getallocatedblocks() - blocks,
+        'gc_collections': [stats['collections'] - before
+                           for stats, before in zip(gc.get_stats(), collections)],
+    }
+    try:
+        import resource
+        result['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass  # Not available on Windows
+    return result
+
+
+def run_isolated(name, frames, memory):
+    command = [sys.executable, os.path.abspath(__file__), 'scenario', name, '--frames', str(frames)]
+    if memory:
+        command.append('--memory')
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(args):
+    import numpy, pygame
+    names = args.scenario or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(sorted(unknown))}; choose from {', '.join(SCENARIOS)}")
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'seed': SEED,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        result = run_isolated(name, args.frames, False)
+        result['memory'] = run_isolated(name, args.frames, True)
+        report['scenarios'][name] = result
+        phases = ', '.join(f"{phase} {stats['mean_ms']:.3f}"
+                           for phase, stats in result['phases'].items())
+        print(f"{name}: {phases} ms; peak {result['memory']['peak_kb']:.0f} KB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+def compare(args):
+    """Print per-phase changes; exit status 1 if anything regressed"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)['scenarios']
+    with open(args.current) as f:
+        current = json.load(f)['scenarios']
+    regressions = 0
+    for name, result in current.items():
+        if name not in baseline:
+            print(f"{name}: no baseline")
+            continue
+        rows = []
+        for phase, stats in result['phases'].items():
+            base = baseline[name]['phases'].get(phase)
+            if base is None:
+                continue
+            for key in ('mean_ms', 'p95_ms'):
+                rows.append((f"{phase} {key[:-3]}", base[key], stats[key], 'ms',
+                             stats[key] - base[key] > NOISE_MS))
+        rows.append(('peak memory', baseline[name]['memory']['peak_kb'],
+                     result['memory']['peak_kb'], 'KB', True))
+        print(name)
+        for label, old, new, unit, significant in rows:
+            change = (new - old) / old if old else 0.0
+            flag = ''
+            if significant and change > args.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"  {label:<20} {old:10.3f} -> {new:10.3f} {unit} {change:+7.1%}{flag}")
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ninja Contra benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the scenarios and report timings")
+    run_parser.add_argument('scenario', nargs='*',
+                            help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    run_parser.add_argument('--frames', type=int, default=FRAMES,
+                            help=f"frames per scenario (default: {FRAMES})")
+    run_parser.add_argument('--output', '-o', metavar='FILE', help="write the results as JSON")
+
+    compare_parser = commands.add_parser('compare', help="flag regressions against a baseline")
+    compare_parser.add_argument('baseline', help="results JSON to compare against")
+    compare_parser.add_argument('current', help="new results JSON")
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help=f"relative slowdown that counts as a regression (default: {THRESHOLD})")
+
+    # Internal: one scenario in this process, result as JSON on stdout
+    scenario_parser = commands.add_parser('scenario')
+    scenario_parser.add_argument('name', choices=list(SCENARIOS))
+    scenario_parser.add_argument('--frames', type=int, default=FRAMES)
+    scenario_parser.add_argument('--memory', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'compare':
+        sys.exit(compare(args))
+    else:
+        print(json.dumps(measure(args.name, args.frames, args.memory)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""Reinforcement-learning environments over the headless game.
+
+NinjaEnv wraps one Game in the familiar reset()/step(action) API:
+
+    env = NinjaEnv(seed=1)
+    obs = env.reset()
+    obs, reward, done, info = env.step(INPUT_RIGHT | INPUT_SHOOT)
+
+VectorEnv runs many seeded games across worker processes. Actions,
+observations, rewards and flags live in shared memory that every process
+maps, so a step only sends a one-word command down each pipe; nothing
+proportional to the batch is ever pickled.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import multiprocessing
+import random
+import traceback
+
+import numpy as np
+
+import main
+from main import INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_SHOOT, SCREEN_WIDTH, SCREEN_HEIGHT
+
+# Actions are input bitmasks over the four gameplay inputs, so 16 in all
+ACTION_MASK = INPUT_LEFT | INPUT_RIGHT | INPUT_JUMP | INPUT_SHOOT
+NUM_ACTIONS = ACTION_MASK + 1
+
+# Observation layout (float32): player block, then the nearest enemies and enemy shots
+NEAREST_ENEMIES = 8
+NEAREST_SHOTS = 8
+PLAYER_FEATURES = 11  # progress, y, vel_y, on_ground, facing, health, lives, invincible, weapon one-hot (3)
+ENEMY_FEATURES = 3  # dx, dy, present
+SHOT_FEATURES = 5  # dx, dy, vx, vy, present
+OBS_SIZE = PLAYER_FEATURES + NEAREST_ENEMIES * ENEMY_FEATURES + NEAREST_SHOTS * SHOT_FEATURES
+
+WEAPONS = ('normal', 'spread', 'rapid')
+MAX_EPISODE_STEPS = 18000  # Five minutes of game time
+LEVEL_REWARD = 10.0
+SCREEN_SCALE = np.array((1 / SCREEN_WIDTH, 1 / SCREEN_HEIGHT))
+SHOT_SCALE = np.array((1 / SCREEN_WIDTH, 1 / SCREEN_HEIGHT, 1 / main.BULLET_SPEED, 1 / main.BULLET_SPEED))
+LIFE_PENALTY = 5.0
+
+
+def nearest(rows, count):
+    """Indices of the count rows whose first two columns (dx, dy) are shortest, nearest first"""
+    distance = rows[:, 0] ** 2 + rows[:, 1] ** 2
+    if len(distance) <= count:
+        return np.argsort(distance, kind='stable')
+    index = np.argpartition(distance, count)[:count]
+    return index[np.argsort(distance[index], kind='stable')]
+
+
+class NinjaEnv:
+    """One headless game behind reset()/step(action).
+
+    Each step feeds one frame of input (see NUM_ACTIONS) and returns
+    (obs, reward, done, info). The reward is score gained / 100, minus
+    damage taken / 100 and LIFE_PENALTY per life lost, plus LEVEL_REWARD
+    for clearing a level. The env then confirms the next level itself, through
+    the input as Enter would, so env.replay() plays past it too. An episode
+    is done at game over, or when max_steps runs out (info['truncated']).
+    The observation array is reused, so copy it to keep it past the next step.
+    """
+
+    def __init__(self, seed=None, character_num=1, max_steps=MAX_EPISODE_STEPS, horde=False, bullet_hell=False,
+                 obs=None):
+        """obs, if given, is a float32 array of OBS_SIZE every observation is written into"""
+        self.character_num = character_num
+        self.max_steps = max_steps
+        self.horde = horde
+        self.bullet_hell = bullet_hell
+        # Episode seeds come from here, so a seeded env replays every episode
+        self.rng = random.Random(seed)
+        self.game = None
+        self.steps = 0
+        self.obs = np.zeros(OBS_SIZE, dtype=np.float32) if obs is None else obs
+        # Views of the three blocks, so observe() writes each with a couple of slice assignments
+        enemies_end = PLAYER_FEATURES + NEAREST_ENEMIES * ENEMY_FEATURES
+        self.enemy_block = self.obs[PLAYER_FEATURES:enemies_end].reshape(NEAREST_ENEMIES, ENEMY_FEATURES)
+        self.shot_block = self.obs[enemies_end:].reshape(NEAREST_SHOTS, SHOT_FEATURES)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.rng.getrandbits(32)
+        self.input = main.ReplayInput(bytearray())
+        self.game = main.Game(self.character_num, self.input, None, seed,
+                              horde=self.horde, bullet_hell=self.bullet_hell)
+        self.steps = 0
+        return self.observe()
+
+    def step(self, action):
+        game = self.game
+        player = game.player
+        score, health, lives = game.score, player.health, player.lives
+        # Appended masks are read back by the game, so input.masks is a replayable recording
+        self.input.masks.append(action & ACTION_MASK)
+        game.step()
+        self.steps += 1
+        reward = (game.score - score) / 100.0
+        if player.lives < lives:
+            reward -= LIFE_PENALTY * (lives - player.lives)
+        elif player.health < health:
+            reward -= (health - player.health) / 100.0
+        if game.level_complete:
+            reward += LEVEL_REWARD
+            if not game.game_over:
+                # Move on the way Enter would, so the recording holds it and replays follow
+                game.loader.thread.join()
+                self.input.masks.append(main.INPUT_CONFIRM)
+                game.step()
+        truncated = self.steps >= self.max_steps and not game.game_over
+        done = game.game_over or truncated
+        info = {'score': game.score, 'level': game.level_num, 'truncated': truncated}
+        return self.observe(), reward, done, info
+
+    def replay(self):
+        """The current episode as a Replay, for watching with main.py --replay"""
+        game = self.game
+        return main.Replay(game.seed, self.character_num, bytes(self.input.masks),
+                           self.bullet_hell, False, self.horde)
+
+    def observe(self):
+        """Write the current observation into self.obs and return it"""
+        out = self.obs
+        game = self.game
+        player = game.player
+        level = game.level
+        px, py = player.rect.center
+
+        weapon = WEAPONS.index(player.weapon)
+        out[:PLAYER_FEATURES] = (px / level.width, py / SCREEN_HEIGHT, player.vel_y / -main.JUMP_STRENGTH,
+                                 player.on_ground, 1.0 if player.facing_right else -1.0,
+                                 player.health / player.max_health, player.lives, player.invincible > 0,
+                                 weapon == 0, weapon == 1, weapon == 2)
+
+        # Nearest living enemies, sprites and horde together, relative to the player
+        centers = np.array([enemy.rect.center for enemy in level.enemies if not enemy.dying],
+                           dtype=np.float64).reshape(-1, 2)
+        horde = level.horde
+        if horde and horde.count:
+            living = np.flatnonzero(~horde.dying[:horde.count])
+            centers = np.concatenate((centers, np.column_stack((horde.x[living] + horde.WIDTH / 2,
+                                                                horde.y[living] + horde.HEIGHT / 2))))
+        rows = centers - (px, py)
+        index = nearest(rows, NEAREST_ENEMIES)
+        block = self.enemy_block
+        block[len(index):] = 0.0
+        block[:len(index), :2] = rows[index] * SCREEN_SCALE
+        block[:len(index), 2] = 1.0
+
+        # Nearest enemy shots, with their velocity
+        shots = game.projectiles
+        live = np.flatnonzero(shots.owner[:shots.count] == shots.OWNER_ENEMY)
+        block = self.shot_block
+        if not len(live):
+            block.fill(0.0)
+            return out
+        rows = np.column_stack((shots.x[live] - px, shots.y[live] - py, shots.vx[live], shots.vy[live]))
+        index = nearest(rows, NEAREST_SHOTS)
+        block[len(index):] = 0.0
+        block[:len(index), :4] = rows[index] * SHOT_SCALE
+        block[:len(index), 4] = 1.0
+        return out
+
+
+# Vector environment: shared arrays, one worker process per slice of envs
+
+def shared_views(buffers, num_envs):
+    """NumPy views over the shared buffers; no copies"""
+    return {
+        'actions': np.frombuffer(buffers['actions'], dtype=np.uint8),
+        'obs': np.frombuffer(buffers['obs'], dtype=np.float32).reshape(num_envs, OBS_SIZE),
+        'rewards': np.frombuffer(buffers['rewards'], dtype=np.float32),
+        'dones': np.frombuffer(buffers['dones'], dtype=np.bool_),
+        'truncated': np.frombuffer(buffers['truncated'], dtype=np.bool_),
+        'scores': np.frombuffer(buffers['scores'], dtype=np.int64),
+        'levels': np.frombuffer(buffers['levels'], dtype=np.int32),
+    }
+
+
+def worker(conn, buffers, num_envs, start, seeds, env_kwargs):
+    """Steps envs [start, start + len(seeds)) on command, in place in the shared arrays"""
+    views = shared_views(buffers, num_envs)
+    stop = start + len(seeds)
+    actions, obs, rewards = views['actions'], views['obs'], views['rewards']
+    dones, truncated, scores, levels = views['dones'], views['truncated'], views['scores'], views['levels']
+    envs = [NinjaEnv(seed, obs=obs[i], **env_kwargs) for i, seed in enumerate(seeds, start)]
+    try:
+        while True:
+            command = conn.recv()
+            if command == 'close':
+                break
+            try:
+                for i, env in zip(range(start, stop), envs):
+                    if command == 'reset':
+                        env.reset()
+                        rewards[i] = 0.0
+                        dones[i] = truncated[i] = False
+                    else:
+                        _, reward, done, info = env.step(int(actions[i]))
+                        rewards[i], dones[i], truncated[i] = reward, done, info['truncated']
+                        scores[i], levels[i] = info['score'], info['level']
+                        if done:
+                            env.reset()  # The next episode's first observation replaces the last
+                conn.send(None)
+            except Exception:
+                conn.send(traceback.format_exc())
+    finally:
+        conn.close()
+
+
+class VectorEnv:
+    """num_envs independent seeded games stepped in parallel by worker processes.
+
+    step(actions) takes one action per env and returns (obs, rewards,
+    dones, infos), with infos holding 'truncated', 'score' and 'level'
+    arrays. A finished env is reset at once: its row of obs is already the
+    next episode's first observation, and score/level describe the episode
+    that ended. With copy=False the arrays returned are the shared buffers
+    themselves, valid until the next step.
+    """
+
+    def __init__(self, num_envs, seed=0, processes=None, copy=True, **env_kwargs):
+        self.num_envs = num_envs
+        self.copy = copy
+        processes = min(num_envs, processes or os.cpu_count() or 1)
+        # Spawned workers start clean: no inherited pygame, SDL or thread state
+        context = multiprocessing.get_context('spawn')
+        self.buffers = {
+            'actions': context.RawArray('B', num_envs),
+            'obs': context.RawArray('f', num_envs * OBS_SIZE),
+            'rewards': context.RawArray('f', num_envs),
+            'dones': context.RawArray('b', num_envs),
+            'truncated': context.RawArray('b', num_envs),
+            'scores': context.RawArray('q', num_envs),
+            'levels': context.RawArray('i', num_envs),
+        }
+        self.views = shared_views(self.buffers, num_envs)
+        seeds = [seed + i for i in range(num_envs)]
+        self.pipes = []
+        self.processes = []
+        for chunk in np.array_split(np.arange(num_envs), processes):
+            parent, child = context.Pipe()
+            start = int(chunk[0])
+            process = context.Process(target=worker, name=f"env-{start}", daemon=True,
+                                      args=(child, self.buffers, num_envs, start,
+                                            seeds[start:start + len(chunk)], env_kwargs))
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def command(self, name):
+        for pipe in self.pipes:
+            pipe.send(name)
+        errors = [error for error in (pipe.recv() for pipe in self.pipes) if error]
+        if errors:
+            raise RuntimeError("Environment worker failed:\n" + errors[0])
+
+    def output(self, name):
+        view = self.views[name]
+        return view.copy() if self.copy else view
+
+    def reset(self):
+        self.command('reset')
+        return self.output('obs')
+
+    def step(self, actions):
+        self.views['actions'][:] = actions
+        self.command('step')
+        infos = {'truncated': self.output('truncated'), 'score': self.output('scores'),
+                 'level': self.output('levels')}
+        return self.output('obs'), self.output('rewards'), self.output('dones'), infos
+
+    def close(self):
+        for pipe, process in zip(self.pipes, self.processes):
+            try:
+                pipe.send('close')
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            pipe.close()
+        self.pipes = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
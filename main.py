@@ -2,23 +2,39 @@
 Contra-style 2D Shooter Game - Full Version
 Run with: python main.py
 Controls: Arrow keys to move, Space to jump, Z to shoot, X for special weapon
+Record a run with --record FILE, play it back with --replay FILE [--max-speed]
 """
 
 import pygame
+import numpy as np
 import random
 import sys
 import os
 import math
+import argparse
+import gc
+import json
+import mmap
+import queue
+import shlex
+import struct
+import subprocess
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
 
 # Initialize Pygame
 pygame.init()
-pygame.mixer.init()
+try:
+    pygame.mixer.init()
+except pygame.error:
+    pass  # No audio device (e.g. CI boxes); sounds fall back to silence
 
 # Screen settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Python Contra")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -35,7 +51,32 @@ PURPLE = (128, 0, 128)
 GRAY = (100, 100, 100)
 
 # Game settings
-FPS = 60
+FPS = 60  # Simulation rate; physics and timers are counted in these ticks
+FRAME_MS = 1000 / FPS
+MAX_CATCHUP_STEPS = 5  # Ticks per rendered frame before the sim is allowed to slow down
+RENDER_FPS = 240  # Render cap; 0 renders as fast as the machine allows
+DIRTY_RECT_LIMIT = 64  # More changed regions than this and a full flip is cheaper
+PROFILE_WINDOW = 240  # Frames of history behind the profiler graph and percentiles
+PROFILE_MAX_EVENTS = 500000  # Trace events kept for export (oldest dropped first)
+IDLE_FPS = 15  # Loop rate while a static screen (pause, game over...) is showing
+MENU_FPS = 30  # The menu only animates its background
+BROADPHASE = 'grid'  # 'grid' (column index) or 'brute' (every pair) for collision checks
+COLLISION_CELL = 128  # Width of the enemy and platform index columns, in pixels
+BULLET_HELL_RING = 64  # Stress mode: shots per enemy volley...
+BULLET_HELL_INTERVAL = 4  # ...fired every this many ticks
+TRANSFORM_CACHE_BYTES = 32 * 1024 * 1024  # Memory cap for cached surface transforms
+TRANSFORM_ANGLE_STEP = 5  # Rotations are quantised to this many degrees
+WORLD_CHUNK_WIDTH = 512  # Static level geometry is pre-rendered in columns this wide
+GROUND_HEIGHT = 50
+PARALLAX_STEP = 0.05  # Decoration parallax factors are bucketed to multiples of this
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept by the text cache
+ENDLESS_CHUNK_WIDTH = 800  # Endless mode generates and drops the level in chunks this wide
+ENDLESS_BACKDROP_PERIOD = 4000  # Endless decorations repeat every this many pixels
+ENEMY_ACTIVE_MARGIN = 400  # Enemies further than this outside the view sleep
+HORDE_SIZE = 5000  # Zombies in a horde mode level
+HORDE_LEVEL_WIDTH = 20000
+ASSET_BUDGET_BYTES = 48 * 1024 * 1024  # Loaded sprites, tiles and layers kept resident
+CAPTURE_SLOTS = 8  # Frames capture can hold while its writer catches up, before it drops
 GRAVITY = 0.8
 PLAYER_SPEED = 5
 JUMP_STRENGTH = -15
@@ -50,23 +91,76 @@ ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
 SPRITES_DIR = os.path.join(ASSETS_DIR, "sprites")
 SOUNDS_DIR = os.path.join(ASSETS_DIR, "sounds")
 BG_DIR = os.path.join(ASSETS_DIR, "backgrounds")
+ATLAS_PATH = os.path.join(ASSETS_DIR, "atlas.cache")  # Built on first run, see AssetAtlas
 TILES_DIR = os.path.join(ASSETS_DIR, "tiles")
 
 
+def create_screen():
+    """Open the game window; headless runs never call this"""
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Python Contra")
+    return screen
+
+
+def convert_image(img, alpha=True):
+    """Convert to the display pixel format when a display exists"""
+    if pygame.display.get_surface() is None:
+        return img  # Headless: keep the decoded image as-is
+    return img.convert_alpha() if alpha else img.convert()
+
+
+SCREEN_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+# Screen regions the HUD draws into (left stats, right stats, controls hint)
+HUD_RECTS = [pygame.Rect(0, 0, 260, 105), pygame.Rect(SCREEN_WIDTH - 190, 0, 190, 105),
+             pygame.Rect(0, SCREEN_HEIGHT - 30, SCREEN_WIDTH, 30)]
+
+
+def merge_rects(rects):
+    """Clip rects to the screen and union the overlapping ones"""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(SCREEN_RECT)
+        if not rect:
+            continue
+        i = rect.collidelist(merged)
+        while i >= 0:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+dim_overlays = {}
+
+
+def dim_overlay(alpha):
+    """Full-screen translucent black layer, allocated once per alpha"""
+    overlay = dim_overlays.get(alpha)
+    if overlay is None:
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        overlay.fill(BLACK)
+        overlay.set_alpha(alpha)
+        dim_overlays[alpha] = overlay
+    return overlay
+
+
 def load_image(name, size=None, fallback_color=BLUE):
     """Load image or create colored surface as fallback"""
     path = os.path.join(SPRITES_DIR, name)
     try:
-        img = pygame.image.load(path).convert_alpha()
         if size:
-            img = pygame.transform.scale(img, size)
-        return img
+            return asset_atlas.load(path, size)
+        return convert_image(pygame.image.load(path))
     except:
         surf = pygame.Surface(size or (32, 32), pygame.SRCALPHA)
         surf.fill(fallback_color)
         return surf
 
 
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
 def load_sound(name):
     """Load sound or return None"""
     path = os.path.join(SOUNDS_DIR, name)
@@ -76,6 +170,359 @@ def load_sound(name):
         return None
 
 
+class AssetAtlas:
+    """Every image the game loads, pre-scaled, packed into one memory-mapped file.
+
+    Layout: magic, version and index length, a JSON index, then raw RGBA
+    pixels. Entries are keyed by source path and in-game size and stamped
+    with the source's mtime and size, so an edited or missing PNG is simply
+    decoded again. New and refreshed entries are written out by save().
+    """
+    MAGIC = b'NCAT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sII')
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.data = None  # mmap of the atlas file
+        self.base = 0
+        self.added = {}  # key -> (stamp, size, RGBA bytes) decoded this run
+        self.hits = 0
+        self.misses = 0
+        self.open()
+
+    def open(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, length = self.HEADER.unpack_from(data)
+            if magic != self.MAGIC or version != self.VERSION:
+                return
+            self.index = json.loads(data[self.HEADER.size:self.HEADER.size + length])
+            self.base = self.HEADER.size + length
+            self.data = data
+        except (OSError, ValueError, struct.error):
+            pass  # No atlas yet (or a broken one): everything loads from the PNGs
+
+    @staticmethod
+    def stamp(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def load(self, path, size, alpha=True):
+        """The image at path scaled to size; raises like pygame.image.load if it is missing"""
+        key = f"{os.path.relpath(path, ASSETS_DIR)}|{size[0]}x{size[1]}"
+        stamp = self.stamp(path)
+        entry = self.index.get(key)
+        if entry and entry['stamp'] == stamp and self.data:
+            self.hits += 1
+            start = self.base + entry['offset']
+            pixels = memoryview(self.data)[start:start + size[0] * size[1] * 4]
+            image = pygame.image.frombuffer(pixels, size, 'RGBA')
+            converted = convert_image(image, alpha)
+            # Headless nothing converts, and a surface over the read-only map must never be drawn on
+            return image.copy() if converted is image else converted
+
+        self.misses += 1
+        img = pygame.transform.scale(convert_image(pygame.image.load(path), alpha), size)
+        self.added[key] = (stamp, size, pygame.image.tobytes(img, 'RGBA'))
+        return img
+
+    def save(self):
+        """Rewrite the atlas if this run decoded anything it did not hold"""
+        if not self.added:
+            return
+        blobs = {}
+        for key, entry in self.index.items():
+            path = os.path.join(ASSETS_DIR, key.rsplit('|', 1)[0])
+            try:
+                if key in self.added or self.stamp(path) != entry['stamp']:
+                    continue  # Stale: dropped unless re-decoded this run
+            except OSError:
+                continue
+            start = self.base + entry['offset']
+            blobs[key] = (entry['stamp'], entry['size'],
+                          self.data[start:start + entry['size'][0] * entry['size'][1] * 4])
+        blobs.update(self.added)
+
+        index, offset = {}, 0
+        for key, (stamp, size, pixels) in blobs.items():
+            index[key] = {'stamp': stamp, 'size': list(size), 'offset': offset}
+            offset += len(pixels)
+        header = json.dumps(index).encode()
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(header)))
+                f.write(header)
+                for _, _, pixels in blobs.values():
+                    f.write(pixels)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return  # Read-only install, or the old atlas is still mapped (Windows)
+        self.added.clear()
+        self.open()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.index),
+                'bytes': len(self.data) if self.data else 0}
+
+
+asset_atlas = AssetAtlas(ATLAS_PATH)
+
+
+def asset_bytes(asset):
+    """Pixel bytes held by a surface or by any nesting of tuples, lists and dicts of them"""
+    if isinstance(asset, pygame.Surface):
+        return surface_bytes(asset)
+    if isinstance(asset, dict):
+        asset = asset.values()
+    elif not isinstance(asset, (tuple, list)):
+        return 0
+    return sum(asset_bytes(item) for item in asset)
+
+
+class AssetManager:
+    """Owns loaded surfaces, grouped by what they belong to.
+
+    The shared group holds what every level uses (player and zombie frames,
+    kunai) and is never evicted, so it survives restarts and level changes.
+    Each theme has its own group for tiles, backdrop, sky and decorations.
+    When the resident pixels go over the budget, whole groups are released
+    in least-recently-used order, never the one just used.
+    """
+    SHARED = 'shared'
+
+    def __init__(self, budget_bytes=ASSET_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.groups = OrderedDict()  # group -> {key: asset}, least recently used first
+        self.group_bytes = {}
+        self.resident_bytes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def theme(theme):
+        return f'theme:{theme}'
+
+    def get(self, group, key, load):
+        """The asset stored under key in group, calling load() the first time"""
+        assets = self.groups.get(group)
+        if assets is None:
+            assets = self.groups[group] = {}
+            self.group_bytes[group] = 0
+        else:
+            self.groups.move_to_end(group)
+        if key in assets:
+            return assets[key]
+
+        asset = assets[key] = load()
+        size = asset_bytes(asset)
+        self.group_bytes[group] += size
+        self.resident_bytes += size
+        if self.resident_bytes > self.budget_bytes:
+            self.evict(keep=group)
+        return asset
+
+    def evict(self, keep):
+        for group in list(self.groups):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if group != keep and group != self.SHARED:
+                self.release(group)
+                self.evictions += 1
+
+    def release(self, group):
+        """Forget a group; its surfaces are freed once nothing on screen uses them"""
+        if self.groups.pop(group, None) is not None:
+            self.resident_bytes -= self.group_bytes.pop(group)
+
+    def stats(self):
+        return {
+            'resident_bytes': self.resident_bytes,
+            'budget_bytes': self.budget_bytes,
+            'groups': dict(self.group_bytes),
+            'evictions': self.evictions,
+        }
+
+
+asset_manager = AssetManager()
+
+
+class SpriteCache:
+    """Scaled animation frames shared by every sprite, kept in the shared asset group"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_frames(self, sprite_dir, pattern, indices, size, flip=False, fallback_color=BLUE):
+        """Return a read-only tuple of frames, loading them on first use"""
+        def load():
+            self.misses += 1
+            if flip:
+                # Flipped sets are built from the (cached) unflipped set, never re-decoded
+                source = self.get_frames(sprite_dir, pattern, indices, size, False, fallback_color)
+                return tuple(pygame.transform.flip(f, True, False) for f in source)
+            return tuple(self.load_frame(os.path.join(sprite_dir, pattern.format(i)), size, fallback_color)
+                         for i in indices)
+
+        misses = self.misses
+        frames = asset_manager.get(AssetManager.SHARED, ('frames', sprite_dir, pattern, indices, size, flip),
+                                   load)
+        if self.misses == misses:
+            self.hits += 1
+        return frames
+
+    def load_frame(self, path, size, fallback_color):
+        """Load and scale a single frame with fallback"""
+        try:
+            return asset_atlas.load(path, size)
+        except:
+            surf = pygame.Surface(size, pygame.SRCALPHA)
+            surf.fill(fallback_color)
+            return surf
+
+    def stats(self):
+        """Hit/miss counters and resident size of the cached frames"""
+        shared = asset_manager.groups.get(AssetManager.SHARED, {})
+        frame_sets = [frames for key, frames in shared.items() if key[0] == 'frames']
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'frame_sets': len(frame_sets),
+            'surfaces': sum(len(frames) for frames in frame_sets),
+            'bytes': asset_bytes(frame_sets),
+        }
+
+
+sprite_cache = SpriteCache()
+
+
+class TransformCache:
+    """LRU cache of scaled, flipped and rotated copies of source surfaces.
+
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=TRANSFORM_CACHE_BYTES, angle_step=TRANSFORM_ANGLE_STEP):
+        # (source surface, size, flip, angle) -> transformed surface, oldest first
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.angle_step = angle_step
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, source, size=None, flip=False, angle=0):
+        """Source scaled to size, then flipped horizontally, then rotated by angle degrees"""
+        angle = round(angle / self.angle_step) * self.angle_step % 360
+        if size == source.get_size():
+            size = None
+        if size is None and not flip and angle == 0:
+            return source
+
+        # The key holds a reference to source, so its identity can't be reused while cached
+        key = (source, size, flip, angle)
+        image = self.entries.get(key)
+        if image is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return image
+
+        self.misses += 1
+        image = source
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        if flip:
+            image = pygame.transform.flip(image, True, False)
+        if angle:
+            image = pygame.transform.rotate(image, angle)
+        self.entries[key] = image
+        self.bytes += surface_bytes(image)
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= surface_bytes(evicted)
+            self.evictions += 1
+        return image
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+        }
+
+
+transform_cache = TransformCache()
+
+
+class TextCache:
+    """Shared fonts plus an LRU cache of rendered (antialiased) text"""
+
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.fonts = {}  # size -> Font
+        self.rendered = OrderedDict()  # (font, text, color) -> Surface, oldest first
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size):
+        """The default font at a size, created once per process"""
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def render(self, font, text, color):
+        """Rendered text, only re-rendered when font, text or color change"""
+        key = (font, text, color)
+        surface = self.rendered.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.rendered.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.rendered[key] = font.render(text, True, color)
+        if len(self.rendered) > self.max_entries:
+            self.rendered.popitem(last=False)
+        return surface
+
+
+text_cache = TextCache()
+
+
+class Pool:
+    """Recycles short-lived objects instead of freeing them.
+
+    acquire() hands out a released instance, re-initialised through its
+    reset(), or makes a new one; release() takes it back for later.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.created = 0
+
+    def acquire(self, *args):
+        try:
+            obj = self.free.pop()
+        except IndexError:
+            obj = self.factory()
+            self.created += 1
+        obj.reset(*args)
+        return obj
+
+    def release(self, obj):
+        self.free.append(obj)
+
+    def release_all(self, objs):
+        self.free.extend(objs)
+
+
 class SoundManager:
     def __init__(self):
         self.sounds = {
@@ -108,17 +555,167 @@ class SoundManager:
 sound_manager = SoundManager()
 
 
-class MainMenu:
+class KeyboardInput:
+    """Input source backed by the real pygame event queue and keyboard"""
+
+    def poll(self):
+        return pygame.event.get()
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+
+class KeyState:
+    """Minimal stand-in for pygame.key.get_pressed() built from a set of held keys"""
+
+    def __init__(self, held):
+        self.held = held
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class ScriptedInput:
+    """Input source driven from code, for headless simulation runs"""
+
     def __init__(self):
-        self.title_font = pygame.font.Font(None, 80)
-        self.menu_font = pygame.font.Font(None, 48)
-        self.small_font = pygame.font.Font(None, 32)
+        self.held = set()
+        self.pending = []
+
+    def hold(self, key):
+        self.held.add(key)
+
+    def release(self, key):
+        self.held.discard(key)
+
+    def press(self, key):
+        """Queue a single KEYDOWN for the next poll"""
+        self.pending.append(key)
+
+    def poll(self):
+        events = [pygame.event.Event(pygame.KEYDOWN, key=key) for key in self.pending]
+        self.pending.clear()
+        return events
+
+    def get_pressed(self):
+        return KeyState(self.held)
+
+
+# Per-frame input bitmask: held movement keys plus keys pressed this frame
+INPUT_LEFT = 1 << 0
+INPUT_RIGHT = 1 << 1
+INPUT_JUMP = 1 << 2
+INPUT_SHOOT = 1 << 3
+INPUT_PAUSE = 1 << 4
+INPUT_CONFIRM = 1 << 5
+INPUT_RESTART = 1 << 6
+INPUT_MENU = 1 << 7
+
+HELD_INPUTS = [(INPUT_LEFT, pygame.K_LEFT), (INPUT_RIGHT, pygame.K_RIGHT)]
+PRESSED_INPUTS = [
+    (INPUT_JUMP, pygame.K_SPACE),
+    (INPUT_SHOOT, pygame.K_z),
+    (INPUT_PAUSE, pygame.K_p),
+    (INPUT_CONFIRM, pygame.K_RETURN),
+    (INPUT_RESTART, pygame.K_r),
+    (INPUT_MENU, pygame.K_ESCAPE),
+]
+
+
+# Non-input events an input source passes straight through to the game
+WINDOW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+# Keys that only affect debugging tools, never the simulation, so they are not recorded
+DEBUG_KEYS = (pygame.K_F3, pygame.K_F4)
+
+
+def input_mask(events, keys):
+    """Pack one frame of input into a bitmask"""
+    mask = 0
+    for bit, key in HELD_INPUTS:
+        if keys[key]:
+            mask |= bit
+    pressed = {event.key for event in events if event.type == pygame.KEYDOWN}
+    for bit, key in PRESSED_INPUTS:
+        if key in pressed:
+            mask |= bit
+    return mask
+
+
+def mask_events(mask):
+    """KEYDOWN events encoded in a bitmask, in a fixed order"""
+    return [pygame.event.Event(pygame.KEYDOWN, key=key) for bit, key in PRESSED_INPUTS if mask & bit]
+
+
+def mask_keys(mask):
+    return KeyState({key for bit, key in HELD_INPUTS if mask & bit})
+
+
+class InputRecorder:
+    """Wraps an input source and records one bitmask per frame.
+
+    The game is fed the input as decoded from the mask rather than the raw
+    events, so what was played is exactly what a replay will see.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.masks = bytearray()
+        self.keys = mask_keys(0)
+
+    def poll(self):
+        events = self.source.poll()
+        mask = input_mask(events, self.source.get_pressed())
+        self.masks.append(mask)
+        self.keys = mask_keys(mask)
+        passthrough = [event for event in events
+                       if event.type == pygame.QUIT or event.type in WINDOW_EVENTS
+                       or (event.type == pygame.KEYDOWN and event.key in DEBUG_KEYS)]
+        return mask_events(mask) + passthrough
+
+    def get_pressed(self):
+        return self.keys
+
+
+class ReplayInput:
+    """Input source that plays back recorded bitmasks"""
+
+    def __init__(self, masks):
+        self.masks = masks
+        self.frame = 0
+        self.keys = mask_keys(0)
+
+    @property
+    def finished(self):
+        return self.frame >= len(self.masks)
+
+    def poll(self):
+        if self.finished:
+            self.keys = mask_keys(0)
+            return []
+        mask = self.masks[self.frame]
+        self.frame += 1
+        self.keys = mask_keys(mask)
+        return mask_events(mask)
+
+    def get_pressed(self):
+        return self.keys
+
+
+class MainMenu:
+    def __init__(self, surface):
+        self.surface = surface
+        self.title_font = text_cache.font(80)
+        self.menu_font = text_cache.font(48)
+        self.small_font = text_cache.font(32)
         self.selected = 0
         self.menu_items = ['Start Game', 'Select Character', 'Quit']
         self.character_select = False
         self.selected_character = 1  # 1 or 2
         self.character_previews = self.load_character_previews()
         self.bg_offset = 0
+        # Dimmed overlay plus text, composed once per menu state
+        self.foreground = None
+        self.foreground_key = None
 
     def load_character_previews(self):
         """Load preview images for character selection"""
@@ -127,8 +724,7 @@ class MainMenu:
             char_dir = os.path.join(SPRITES_DIR, f'player{char_num}')
             path = os.path.join(char_dir, 'Idle__000.png')
             try:
-                img = pygame.image.load(path).convert_alpha()
-                previews[char_num] = pygame.transform.scale(img, (120, 120))
+                previews[char_num] = asset_atlas.load(path, (120, 120))
             except:
                 surf = pygame.Surface((120, 120), pygame.SRCALPHA)
                 color = BLUE if char_num == 1 else PURPLE
@@ -171,66 +767,70 @@ class MainMenu:
         return None
 
     def draw(self):
-        # Animated background
-        self.bg_offset = (self.bg_offset + 1) % 100
+        # Animated background (same speed as at 60 FPS)
+        self.bg_offset = (self.bg_offset + 60 // MENU_FPS) % 100
         for y in range(0, SCREEN_HEIGHT + 100, 100):
             for x in range(0, SCREEN_WIDTH + 100, 100):
                 color = (30 + (x + y + self.bg_offset) % 20, 
                         20 + (x + y + self.bg_offset) % 15, 
                         40 + (x + y + self.bg_offset) % 25)
-                pygame.draw.rect(screen, color, (x - self.bg_offset, y - self.bg_offset, 100, 100))
-        
-        # Dark overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(150)
-        screen.blit(overlay, (0, 0))
-        
-        if self.character_select:
-            self.draw_character_select()
-        else:
-            self.draw_main_menu()
+                pygame.draw.rect(self.surface, color, (x - self.bg_offset, y - self.bg_offset, 100, 100))
         
+        self.surface.blit(self.get_foreground(), (0, 0))
         pygame.display.flip()
 
-    def draw_main_menu(self):
+    def get_foreground(self):
+        """Dark overlay and menu text, re-composed only when the selection changes"""
+        key = (self.character_select, self.selected, self.selected_character)
+        if key != self.foreground_key:
+            layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            layer.fill((0, 0, 0, 150))
+            if self.character_select:
+                self.draw_character_select(layer)
+            else:
+                self.draw_main_menu(layer)
+            self.foreground = convert_image(layer)
+            self.foreground_key = key
+        return self.foreground
+
+    def draw_main_menu(self, target):
         # Title
-        title = self.title_font.render("NINJA CONTRA", True, RED)
-        title_shadow = self.title_font.render("NINJA CONTRA", True, BLACK)
-        screen.blit(title_shadow, (SCREEN_WIDTH // 2 - title.get_width() // 2 + 3, 103))
-        screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 100))
+        title = text_cache.render(self.title_font, "NINJA CONTRA", RED)
+        title_shadow = text_cache.render(self.title_font, "NINJA CONTRA", BLACK)
+        target.blit(title_shadow, (SCREEN_WIDTH // 2 - title.get_width() // 2 + 3, 103))
+        target.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 100))
         
         # Subtitle
-        subtitle = self.small_font.render("Zombie Apocalypse", True, ORANGE)
-        screen.blit(subtitle, (SCREEN_WIDTH // 2 - subtitle.get_width() // 2, 170))
+        subtitle = text_cache.render(self.small_font, "Zombie Apocalypse", ORANGE)
+        target.blit(subtitle, (SCREEN_WIDTH // 2 - subtitle.get_width() // 2, 170))
         
         # Menu items
         for i, item in enumerate(self.menu_items):
             color = YELLOW if i == self.selected else WHITE
-            text = self.menu_font.render(item, True, color)
+            text = text_cache.render(self.menu_font, item, color)
             y = 280 + i * 60
-            screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y))
+            target.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y))
             
             # Selection indicator
             if i == self.selected:
-                pygame.draw.polygon(screen, YELLOW, [
+                pygame.draw.polygon(target, YELLOW, [
                     (SCREEN_WIDTH // 2 - text.get_width() // 2 - 30, y + 15),
                     (SCREEN_WIDTH // 2 - text.get_width() // 2 - 10, y + 5),
                     (SCREEN_WIDTH // 2 - text.get_width() // 2 - 10, y + 25)
                 ])
         
         # Current character indicator
-        char_text = self.small_font.render(f"Current: Ninja {self.selected_character}", True, GREEN)
-        screen.blit(char_text, (SCREEN_WIDTH // 2 - char_text.get_width() // 2, 480))
+        char_text = text_cache.render(self.small_font, f"Current: Ninja {self.selected_character}", GREEN)
+        target.blit(char_text, (SCREEN_WIDTH // 2 - char_text.get_width() // 2, 480))
         
         # Controls hint
-        controls = self.small_font.render("Arrow Keys: Navigate | Enter: Select", True, GRAY)
-        screen.blit(controls, (SCREEN_WIDTH // 2 - controls.get_width() // 2, SCREEN_HEIGHT - 40))
+        controls = text_cache.render(self.small_font, "Arrow Keys: Navigate | Enter: Select", GRAY)
+        target.blit(controls, (SCREEN_WIDTH // 2 - controls.get_width() // 2, SCREEN_HEIGHT - 40))
 
-    def draw_character_select(self):
+    def draw_character_select(self, target):
         # Title
-        title = self.menu_font.render("SELECT CHARACTER", True, WHITE)
-        screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 80))
+        title = text_cache.render(self.menu_font, "SELECT CHARACTER", WHITE)
+        target.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 80))
         
         # Character boxes
         for i, char_num in enumerate([1, 2]):
@@ -239,20 +839,20 @@ class MainMenu:
             
             # Box
             box_color = YELLOW if char_num == self.selected_character else GRAY
-            pygame.draw.rect(screen, box_color, (x - 10, y - 10, 170, 220), 3)
+            pygame.draw.rect(target, box_color, (x - 10, y - 10, 170, 220), 3)
             
             # Character preview
             preview = self.character_previews.get(char_num)
             if preview:
-                screen.blit(preview, (x + 25, y + 20))
+                target.blit(preview, (x + 25, y + 20))
             
             # Name
-            name = self.small_font.render(f"Ninja {char_num}", True, WHITE)
-            screen.blit(name, (x + 85 - name.get_width() // 2, y + 160))
+            name = text_cache.render(self.small_font, f"Ninja {char_num}", WHITE)
+            target.blit(name, (x + 85 - name.get_width() // 2, y + 160))
         
         # Instructions
-        hint = self.small_font.render("Left/Right: Select | Enter: Confirm | Esc: Back", True, GRAY)
-        screen.blit(hint, (SCREEN_WIDTH // 2 - hint.get_width() // 2, 500))
+        hint = text_cache.render(self.small_font, "Left/Right: Select | Enter: Confirm | Esc: Back", GRAY)
+        target.blit(hint, (SCREEN_WIDTH // 2 - hint.get_width() // 2, 500))
 
 
 class Camera:
@@ -260,28 +860,481 @@ class Camera:
         self.camera = pygame.Rect(0, 0, width, height)
         self.width = width
         self.height = height
+        # Render interpolation between the previous and current simulation tick
+        self.prev_x = 0
+        self.alpha = 1.0
+        self.view_x = 0
+        self.left = 0  # Leftmost x the view may scroll to
 
     def apply(self, rect):
-        return rect.move(-self.camera.x, -self.camera.y)
+        return rect.move(-self.view_x, -self.camera.y)
+
+    def apply_sprite(self, sprite):
+        """Screen rect of a moving sprite, interpolated between ticks"""
+        x, y = sprite.rect.topleft
+        if self.alpha < 1.0:
+            prev_x, prev_y = sprite.prev_pos
+            x = round(prev_x + (x - prev_x) * self.alpha)
+            y = round(prev_y + (y - prev_y) * self.alpha)
+        return pygame.Rect(x - self.view_x, y - self.camera.y, sprite.rect.width, sprite.rect.height)
+
+    def snapshot(self):
+        self.prev_x = self.camera.x
+
+    def set_alpha(self, alpha):
+        self.alpha = alpha
+        self.view_x = round(self.prev_x + (self.camera.x - self.prev_x) * alpha)
 
     def update(self, target):
         x = target.rect.centerx - SCREEN_WIDTH // 2
-        x = max(0, min(x, self.width - SCREEN_WIDTH))
+        x = max(self.left, min(x, self.width - SCREEN_WIDTH))
         self.camera.x = x
 
 
+class FixedTimestep:
+    """Accumulator that turns variable frame times into fixed simulation ticks"""
+
+    def __init__(self, hz=FPS, time_scale=1.0, max_steps=MAX_CATCHUP_STEPS):
+        self.dt = 1.0 / hz
+        self.time_scale = time_scale
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, frame_seconds):
+        """Add real elapsed time; return how many ticks to simulate now"""
+        self.accumulator += frame_seconds * self.time_scale
+        steps = int(self.accumulator / self.dt)
+        # Fast-forward legitimately needs more ticks per frame than catch-up does
+        limit = max(self.max_steps, math.ceil(self.max_steps * self.time_scale))
+        if steps > limit:
+            # Too far behind: drop the backlog instead of spiralling
+            steps = limit
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        """How far the render time is between the last tick and the next"""
+        return min(1.0, self.accumulator / self.dt)
+
+    def reset(self):
+        self.accumulator = 0.0
+
+
+class EnemyGroup(pygame.sprite.Group):
+    """The level's zombies, bucketed by the world columns their rects span.
+
+    The index lives as long as the group: adding, removing and killing keep
+    it current through the group's own hooks, and Game.update() calls
+    moved() after updating a zombie. Sleeping zombies never move, so a tick
+    touches only the few that do. Queries come back in group order, so
+    callers that stop at the first hit behave exactly like a brute-force
+    loop over the group. Dying zombies are tracked apart, since they stay
+    awake wherever they are and no longer count towards clearing the level.
+    """
+
+    def __init__(self, cell_size=COLLISION_CELL):
+        self.cell_size = cell_size
+        self.columns = {}  # column -> {sprite: group order}
+        self.spans = {}  # sprite -> (first column, last column)
+        self.order = {}  # sprite -> position in group order
+        self.added = 0
+        self.dying = set()
+        super().__init__()
+
+    def __len__(self):
+        # Group's own len() copies the whole sprite list first
+        return len(self.spritedict)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = self.added
+        self.added += 1
+        self.index(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.unindex(sprite)
+        del self.order[sprite]
+        self.dying.discard(sprite)
+
+    def span(self, rect):
+        # Inclusive of the right edge, so a rect touching a column boundary is found from both sides
+        return rect.left // self.cell_size, rect.right // self.cell_size
+
+    def index(self, sprite):
+        first, last = self.spans[sprite] = self.span(sprite.rect)
+        order = self.order[sprite]
+        for column in range(first, last + 1):
+            bucket = self.columns.get(column)
+            if bucket is None:
+                self.columns[column] = {sprite: order}
+            else:
+                bucket[sprite] = order
+
+    def unindex(self, sprite):
+        first, last = self.spans.pop(sprite)
+        for column in range(first, last + 1):
+            bucket = self.columns[column]
+            del bucket[sprite]
+            if not bucket:
+                del self.columns[column]
+
+    def moved(self, sprite):
+        """Re-bucket a sprite whose rect may have changed"""
+        if self.span(sprite.rect) != self.spans[sprite]:
+            self.unindex(sprite)
+            self.index(sprite)
+
+    def in_columns(self, columns):
+        """Sprites spanning any of the given columns, in group order"""
+        found = {}
+        for column in columns:
+            bucket = self.columns.get(column)
+            if bucket:
+                found.update(bucket)
+        return sorted(found, key=found.__getitem__)
+
+    def in_range(self, x0, x1):
+        """Sprites that may overlap world x0..x1, in group order"""
+        return self.in_columns(range(x0 // self.cell_size, x1 // self.cell_size + 1))
+
+    def awake(self, low, high):
+        """Dying sprites and those reaching into world low..high, in group order"""
+        found = {sprite: self.order[sprite] for sprite in self.dying}
+        for column in range(low // self.cell_size, high // self.cell_size + 1):
+            bucket = self.columns.get(column)
+            if bucket:
+                for sprite, order in bucket.items():
+                    if sprite.rect.right >= low and sprite.rect.left <= high:
+                        found[sprite] = order
+        return sorted(found, key=found.__getitem__)
+
+    def living(self):
+        """Sprites not yet dying"""
+        return len(self) - len(self.dying)
+
+
+class FrameProfiler:
+    """Per-phase frame timings for the debug overlay (F3) and trace export (F4).
+
+    Phases are timed with lap(): each call closes the phase that started at
+    the previous begin() or lap(). While disabled every call returns at once.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.last = 0.0
+        self.frame_start = None
+        self.current = {}  # Phase -> ms so far this frame
+        self.frame_times = deque(maxlen=PROFILE_WINDOW)
+        self.history = {}  # Phase -> deque of per-frame ms
+        self.categories = {}
+        self.counts = {}
+        self.events = deque(maxlen=PROFILE_MAX_EVENTS)
+        self.panel = None
+        self.panel_age = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+        self.current.clear()
+
+    def begin(self):
+        if self.enabled:
+            self.last = time.perf_counter()
+
+    def lap(self, phase, category):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + (now - self.last) * 1000
+        self.categories[phase] = category
+        self.events.append(('X', phase, category, self.last, now))
+        self.last = now
+
+    def frame(self, counts):
+        """Close the last rendered frame: commit its phase times and entity counts"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.append((now - self.frame_start) * 1000)
+            for phase, ms in self.current.items():
+                history = self.history.get(phase)
+                if history is None:
+                    history = self.history[phase] = deque(maxlen=PROFILE_WINDOW)
+                history.append(ms)
+            self.events.append(('X', 'frame', 'frame', self.frame_start, now))
+            self.events.append(('C', 'entities', counts, now))
+        self.current.clear()
+        self.frame_start = now
+        self.counts = counts
+
+    def percentiles(self, samples):
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return [ordered[round(q * last)] for q in (0.50, 0.95, 0.99)]
+
+    def build_panel(self):
+        font = text_cache.font(18)
+        rows = [(YELLOW, ["phase ms", "p50", "p95", "p99"])]
+        if self.frame_times:
+            rows.append((WHITE, ["frame"] + ["%.2f" % ms for ms in self.percentiles(self.frame_times)]))
+        for category in ('update', 'draw'):
+            for phase, history in self.history.items():
+                if self.categories[phase] == category and history:
+                    rows.append((WHITE, [phase] + ["%.2f" % ms for ms in self.percentiles(history)]))
+        counts = list(self.counts.items())
+        for i in range(0, len(counts), 3):
+            rows.append((GREEN, ["  ".join(f"{name} {count}" for name, count in counts[i:i + 3])]))
+        panel = pygame.Surface((330, 70 + 14 * len(rows)), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, (color, cells) in enumerate(rows):
+            # Rendered directly: the numbers change too often for the text cache
+            for x, cell in zip((6, 130, 195, 260), cells):
+                panel.blit(font.render(cell, True, color), (x, 70 + 14 * i))
+        return panel
+
+    def draw(self, surface):
+        # The table is rebuilt a few times a second; the graph every frame
+        if self.panel is None or self.panel_age >= 15:
+            self.panel = self.build_panel()
+            self.panel_age = 0
+        self.panel_age += 1
+        x, y = 270, 10
+        surface.blit(self.panel, (x, y))
+        # Rolling frame-time graph, 0-33 ms, with the 60 FPS budget marked
+        budget_y = y + 64 - int(60 * FRAME_MS / 33)
+        pygame.draw.line(surface, RED, (x + 6, budget_y), (x + 324, budget_y))
+        if len(self.frame_times) > 1:
+            step = 318 / (PROFILE_WINDOW - 1)
+            points = [(x + 6 + i * step, y + 64 - min(60, ms * 60 / 33))
+                      for i, ms in enumerate(self.frame_times)]
+            pygame.draw.lines(surface, GREEN, False, points)
+
+    def export(self, path):
+        """Write the recorded events as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        events = []
+        for event in self.events:
+            if event[0] == 'X':
+                _, name, category, start, end = event
+                events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6})
+            else:
+                _, name, counts, at = event
+                events.append({'name': name, 'ph': 'C', 'pid': 1,
+                               'ts': (at - self.origin) * 1e6, 'args': counts})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+
+profiler = FrameProfiler()
+
+
+class GCMonitor:
+    """Garbage collections and the pauses they cause, gathered through gc.callbacks.
+
+    Totals run for the whole process; frame() gives what happened since the
+    previous call, for the profiler. With the profiler on, each collection
+    is also a 'gc' event in the exported trace. Collections can start on any
+    thread and in the middle of an export, so those events wait here until
+    frame() hands them over.
+    """
+
+    def __init__(self):
+        self.started = 0.0
+        self.collections = [0, 0, 0]  # Per generation
+        self.pause_ms = 0.0
+        self.longest_ms = 0.0
+        self.mark = ([0, 0, 0], 0.0)
+        self.events = []
+        gc.callbacks.append(self.callback)
+
+    def callback(self, phase, info):
+        now = time.perf_counter()
+        if phase == 'start':
+            self.started = now
+            return
+        ms = (now - self.started) * 1000
+        self.collections[info['generation']] += 1
+        self.pause_ms += ms
+        self.longest_ms = max(self.longest_ms, ms)
+        if profiler.enabled:
+            self.events.append(('X', f"gc gen{info['generation']}", 'gc', self.started, now))
+
+    def frame(self):
+        """Collections per generation and pause ms since the last call, as profiler counts"""
+        collections, pause_ms = self.mark
+        counts = {f'gc{generation}': now - before
+                  for generation, (now, before) in enumerate(zip(self.collections, collections))}
+        counts['gc_ms'] = round(self.pause_ms - pause_ms, 2)
+        self.mark = (list(self.collections), self.pause_ms)
+        if self.events:
+            events, self.events = self.events, []
+            profiler.events.extend(events)
+        return counts
+
+
+gc_monitor = GCMonitor()
+
+
+def freeze_heap():
+    """Collect once, then move everything still alive to the permanent generation.
+
+    Run after a level loads: the level, its sprites and the loaded assets
+    live until the next one, so collections stop traversing them. Whatever
+    the previous freeze kept is released first, so old levels can still go.
+    """
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+class FrameCapture:
+    """Saves composed screen frames from a writer thread, for QA and training data.
+
+    capture() reads the screen through a pixels2d view (no copy) and copies
+    its whole 32-bit pixels, downscaled by taking every scale-th one, into a
+    free slot of a preallocated ring: one contiguous copy, where going
+    through pixels3d's byte-per-channel view costs twenty times as much.
+    Unpacking to RGB, encoding and I/O happen on the writer thread. When
+    every slot is still waiting to be written the frame is dropped instead,
+    so a slow disk or encoder never stalls the game loop.
+
+    Formats: 'png' writes frame-NNNNNN.png into the target directory, numbered
+    by capture() call so drops show as gaps; 'raw' appends RGB24 frames to
+    the target file; 'pipe' runs the target as a command and streams RGB24
+    frames to its stdin, with {width}, {height} and {fps} filled in.
+    """
+    FORMATS = ('png', 'raw', 'pipe')
+
+    def __init__(self, target, fmt='png', scale=1, size=(SCREEN_WIDTH, SCREEN_HEIGHT), slots=CAPTURE_SLOTS):
+        self.target = target
+        self.format = fmt
+        self.scale = scale
+        self.size = (-(-size[0] // scale), -(-size[1] // scale))
+        width, height = self.size
+        self.ring = np.zeros((slots, height, width), dtype=np.uint32)  # Screen pixels, row-major
+        self.rgb = np.zeros((height, width, 3), dtype=np.uint8)  # The writer's unpacked frame
+        self.channels = None  # Byte of each of R, G, B within a pixel, read from the first surface
+        self.free = deque(range(slots))
+        self.filled = queue.Queue()
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self.output = self.open()
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+        self.thread.start()
+
+    def open(self):
+        width, height = self.size
+        if self.format == 'png':
+            os.makedirs(self.target, exist_ok=True)
+            return None
+        if self.format == 'raw':
+            return open(self.target, 'wb')
+        command = shlex.split(self.target.format(width=width, height=height, fps=FPS))
+        return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def capture(self, surface):
+        """Queue the surface's current contents; False if the frame was dropped"""
+        self.frames += 1
+        try:
+            slot = self.free.popleft()
+        except IndexError:
+            self.dropped += 1
+            return False
+        if self.channels is None:
+            shifts = surface.get_shifts()[:3]
+            self.channels = [shift // 8 if sys.byteorder == 'little' else 3 - shift // 8 for shift in shifts]
+        pixels = pygame.surfarray.pixels2d(surface)
+        np.copyto(self.ring[slot], pixels[::self.scale, ::self.scale].T)
+        del pixels  # The view locks the surface until it goes
+        self.filled.put((self.frames, slot))
+        return True
+
+    def run(self):
+        while True:
+            item = self.filled.get()
+            if item is None:
+                return
+            number, slot = item
+            if self.error is None:
+                try:
+                    self.write(number, self.ring[slot])
+                    self.written += 1
+                except Exception as e:
+                    self.error = e  # Stop writing; close() reports it
+            self.free.append(slot)
+
+    def write(self, number, pixels):
+        channels = pixels.view(np.uint8).reshape(self.rgb.shape[:2] + (4,))
+        rows = self.rgb
+        for i, byte in enumerate(self.channels):
+            rows[..., i] = channels[..., byte]
+        if self.format == 'png':
+            with open(os.path.join(self.target, f"frame-{number:06d}.png"), 'wb') as f:
+                f.write(self.encode_png(rows))
+            return
+        data = rows.tobytes()
+        if self.format == 'raw':
+            self.output.write(data)
+        else:
+            self.output.stdin.write(data)
+
+    @staticmethod
+    def encode_png(rows):
+        """An RGB PNG of a (height, width, 3) array.
+
+        Built here rather than with pygame.image.save, which holds the GIL
+        for the whole encode; zlib lets the game loop run while it compresses.
+        """
+        height, width, _ = rows.shape
+        scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Filter byte 0 (none) per row
+        scanlines[:, 1:] = rows.reshape(height, width * 3)
+
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 1)) + chunk(b'IEND', b''))
+
+    def close(self):
+        """Write out what is queued, close the output and print a summary"""
+        self.filled.put(None)
+        self.thread.join()
+        if self.format == 'raw':
+            self.output.close()
+        elif self.format == 'pipe':
+            try:
+                self.output.stdin.close()
+            except OSError:
+                pass
+            self.output.wait()
+        width, height = self.size
+        print(f"Captured {self.written} of {self.frames} frames ({width}x{height}) to {self.target}, "
+              f"dropped {self.dropped}")
+        if self.error:
+            print(f"Capture stopped early: {self.error}")
+
+
 class AnimatedSprite:
     def __init__(self, frames, frame_duration=100):
         self.frames = frames
         self.frame_duration = frame_duration
         self.current_frame = 0
-        self.last_update = pygame.time.get_ticks()
+        self.elapsed = 0
     
-    def update(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_update > self.frame_duration:
+    def update(self, dt=FRAME_MS):
+        # Advanced by simulated time, not the wall clock, so replays are exact
+        self.elapsed += dt
+        if self.elapsed > self.frame_duration:
             self.current_frame = (self.current_frame + 1) % len(self.frames)
-            self.last_update = now
+            self.elapsed = 0
     
     def get_frame(self):
         return self.frames[self.current_frame]
@@ -298,6 +1351,7 @@ class Player(pygame.sprite.Sprite):
         
         self.image = self.idle_frames_right[0]
         self.rect = self.image.get_rect(topleft=(x, y))
+        self.prev_pos = self.rect.topleft
         self.vel_y = 0
         self.on_ground = False
         self.facing_right = True
@@ -318,51 +1372,27 @@ class Player(pygame.sprite.Sprite):
         self.attack_anim = AnimatedSprite(self.attack_frames_right, 50)
 
     def load_animations(self):
-        """Load all ninja animations"""
+        """Load all ninja animations (shared through sprite_cache)"""
         char_dir = os.path.join(SPRITES_DIR, f'player{self.character_num}')
-        
-        # Idle animation (10 frames)
-        self.idle_frames_right = []
-        for i in range(10):
-            img = self.load_sprite(char_dir, f'Idle__{i:03d}.png')
-            self.idle_frames_right.append(img)
-        self.idle_frames_left = [pygame.transform.flip(f, True, False) for f in self.idle_frames_right]
-        
-        # Run animation (10 frames)
-        self.run_frames_right = []
-        for i in range(10):
-            img = self.load_sprite(char_dir, f'Run__{i:03d}.png')
-            self.run_frames_right.append(img)
-        self.run_frames_left = [pygame.transform.flip(f, True, False) for f in self.run_frames_right]
-        
-        # Jump animation (10 frames)
-        self.jump_frames_right = []
-        for i in range(10):
-            img = self.load_sprite(char_dir, f'Jump__{i:03d}.png')
-            self.jump_frames_right.append(img)
-        self.jump_frames_left = [pygame.transform.flip(f, True, False) for f in self.jump_frames_right]
-        
-        # Attack/Throw animation (10 frames)
-        self.attack_frames_right = []
-        for i in range(10):
-            img = self.load_sprite(char_dir, f'Throw__{i:03d}.png')
-            self.attack_frames_right.append(img)
-        self.attack_frames_left = [pygame.transform.flip(f, True, False) for f in self.attack_frames_right]
-
-    def load_sprite(self, char_dir, filename):
-        """Load a single sprite with fallback"""
-        path = os.path.join(char_dir, filename)
-        try:
-            img = pygame.image.load(path).convert_alpha()
-            return pygame.transform.scale(img, self.SPRITE_SIZE)
-        except:
-            surf = pygame.Surface(self.SPRITE_SIZE, pygame.SRCALPHA)
-            color = BLUE if self.character_num == 1 else PURPLE
-            surf.fill(color)
-            return surf
-
-    def update(self, platforms, level_width):
-        keys = pygame.key.get_pressed()
+        color = BLUE if self.character_num == 1 else PURPLE
+        frames = range(10)
+
+        def load(pattern, flip):
+            return sprite_cache.get_frames(char_dir, pattern, frames, self.SPRITE_SIZE, flip, color)
+
+        # Idle, run, jump and attack/throw animations (10 frames each)
+        self.idle_frames_right = load('Idle__{:03d}.png', False)
+        self.idle_frames_left = load('Idle__{:03d}.png', True)
+        self.run_frames_right = load('Run__{:03d}.png', False)
+        self.run_frames_left = load('Run__{:03d}.png', True)
+        self.jump_frames_right = load('Jump__{:03d}.png', False)
+        self.jump_frames_left = load('Jump__{:03d}.png', True)
+        self.attack_frames_right = load('Throw__{:03d}.png', False)
+        self.attack_frames_left = load('Throw__{:03d}.png', True)
+
+    def update(self, level, keys=None):
+        if keys is None:
+            keys = pygame.key.get_pressed()
         self.moving = False
         
         # Horizontal movement
@@ -376,24 +1406,25 @@ class Player(pygame.sprite.Sprite):
             self.moving = True
         
         # Keep player in level bounds
-        self.rect.x = max(0, min(self.rect.x, level_width - self.rect.width))
+        self.rect.x = max(0, min(self.rect.x, level.width - self.rect.width))
         
         # Apply gravity
         self.vel_y += GRAVITY
+        fall_from = self.rect.bottom
         self.rect.y += self.vel_y
         
         # Platform collision
         self.on_ground = False
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_y > 0 and self.rect.bottom <= platform.rect.bottom:
-                    self.rect.bottom = platform.rect.top
-                    self.vel_y = 0
-                    self.on_ground = True
+        if self.vel_y > 0:
+            top = level.landing(self.rect, fall_from)
+            if top is not None:
+                self.rect.bottom = top
+                self.vel_y = 0
+                self.on_ground = True
         
         # Ground collision
-        if self.rect.bottom >= SCREEN_HEIGHT - 50:
-            self.rect.bottom = SCREEN_HEIGHT - 50
+        if self.rect.bottom >= SCREEN_HEIGHT - GROUND_HEIGHT:
+            self.rect.bottom = SCREEN_HEIGHT - GROUND_HEIGHT
             self.vel_y = 0
             self.on_ground = True
         
@@ -436,8 +1467,8 @@ class Player(pygame.sprite.Sprite):
             self.on_ground = False
             sound_manager.play('jump')
 
-    def shoot(self):
-        bullets = []
+    def shoot(self, projectiles):
+        """Throw kunai into the projectile system if the weapon is ready"""
         cooldown = 15 if self.weapon == 'normal' else (5 if self.weapon == 'rapid' else 20)
         
         if self.shoot_cooldown == 0:
@@ -451,11 +1482,9 @@ class Player(pygame.sprite.Sprite):
             
             if self.weapon == 'spread':
                 for angle in [-15, 0, 15]:
-                    bullets.append(Bullet(bullet_x, self.rect.centery, direction, angle, self.character_num))
+                    projectiles.spawn_kunai(bullet_x, self.rect.centery, direction, angle, self.character_num)
             else:
-                bullets.append(Bullet(bullet_x, self.rect.centery, direction, 0, self.character_num))
-        
-        return bullets
+                projectiles.spawn_kunai(bullet_x, self.rect.centery, direction, 0, self.character_num)
 
     def take_damage(self, amount):
         if self.invincible == 0:
@@ -468,73 +1497,236 @@ class Player(pygame.sprite.Sprite):
                     self.health = self.max_health
                     self.rect.x = 100
                     self.rect.y = SCREEN_HEIGHT - 150
+                    self.prev_pos = self.rect.topleft  # Don't interpolate the respawn jump
                 return self.lives <= 0
         return False
 
+    def screen_rect(self, camera):
+        return camera.apply_sprite(self)
+
     def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
+        draw_rect = camera.apply_sprite(self)
         # Blink when invincible
         if self.invincible == 0 or self.invincible % 10 < 5:
             surface.blit(self.image, draw_rect)
 
 
-class Bullet(pygame.sprite.Sprite):
-    kunai_images = {}
-    
+class ProjectileSystem:
+    """Every live projectile (player kunai and enemy shots) in flat NumPy arrays.
+
+    Slots [0, count) are live, kept in spawn order; a vectorised step moves
+    and culls them all, and drawing is one Surface.blits call over a small
+    set of pre-transformed images.
+    """
+    OWNER_PLAYER = 0
+    OWNER_ENEMY = 1
+    ENEMY_SHOT_SPEED = BULLET_SPEED - 4
     @classmethod
     def load_kunai(cls, character_num):
-        if character_num not in cls.kunai_images:
-            char_dir = os.path.join(SPRITES_DIR, f'player{character_num}')
-            path = os.path.join(char_dir, 'Kunai.png')
+        def load():
+            path = os.path.join(SPRITES_DIR, f'player{character_num}', 'Kunai.png')
             try:
-                img = pygame.image.load(path).convert_alpha()
-                cls.kunai_images[character_num] = pygame.transform.scale(img, (30, 10))
+                return asset_atlas.load(path, (30, 10))
             except:
-                cls.kunai_images[character_num] = None
-    
-    def __init__(self, x, y, direction, angle=0, character_num=1):
-        super().__init__()
-        Bullet.load_kunai(character_num)
-        
-        kunai = Bullet.kunai_images.get(character_num)
-        if kunai:
-            self.image = kunai.copy()
-            if direction < 0:
-                self.image = pygame.transform.flip(self.image, True, False)
-            if angle != 0:
-                self.image = pygame.transform.rotate(self.image, -angle * direction)
-        else:
-            self.image = pygame.Surface((12, 6), pygame.SRCALPHA)
-            self.image.fill(YELLOW)
-        
-        self.rect = self.image.get_rect(center=(x, y))
-        self.direction = direction
-        self.angle = math.radians(angle)
-        self.speed_x = BULLET_SPEED * math.cos(self.angle) * direction
-        self.speed_y = BULLET_SPEED * math.sin(self.angle) * -direction
-        self.x = float(x)
-        self.y = float(y)
-
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.rect.centerx = int(self.x)
-        self.rect.centery = int(self.y)
-        if self.rect.right < 0 or self.rect.left > LEVEL_WIDTH or self.rect.top < 0 or self.rect.bottom > SCREEN_HEIGHT:
-            self.kill()
+                return None
+        return asset_manager.get(AssetManager.SHARED, ('kunai', character_num), load)
+
+    def __init__(self, capacity=256):
+        self.capacity = 0
+        self.count = 0
+        self.images = []
+        self.image_ids = {}
+        self.widths = np.zeros(0, dtype=np.int32)
+        self.heights = np.zeros(0, dtype=np.int32)
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """Reallocate every column to at least capacity slots"""
+        def resized(name, dtype):
+            column = np.zeros(capacity, dtype=dtype)
+            if self.capacity:
+                column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+
+        for name in ('x', 'y', 'vx', 'vy'):
+            resized(name, np.float64)
+        for name in ('left', 'top', 'prev_left', 'prev_top'):
+            resized(name, np.int32)
+        resized('image', np.int16)
+        resized('owner', np.int8)
+        resized('alive', np.bool_)
+        self.capacity = capacity
+
+    def register_image(self, key, build):
+        """Index of a pre-transformed projectile image, building it on first use"""
+        index = self.image_ids.get(key)
+        if index is None:
+            image = build()
+            index = len(self.images)
+            self.images.append(image)
+            self.widths = np.append(self.widths, np.int32(image.get_width()))
+            self.heights = np.append(self.heights, np.int32(image.get_height()))
+            self.image_ids[key] = index
+        return index
+
+    def kunai_image(self, character_num, direction, angle):
+        def build():
+            kunai = self.load_kunai(character_num)
+            if kunai is None:
+                image = pygame.Surface((12, 6), pygame.SRCALPHA)
+                image.fill(YELLOW)
+                return image
+            return transform_cache.get(kunai, flip=direction < 0, angle=-angle * direction)
+
+        return self.register_image(('kunai', character_num, direction, angle), build)
+
+    def enemy_shot_image(self):
+        def build():
+            image = pygame.Surface((10, 10), pygame.SRCALPHA)
+            pygame.draw.circle(image, RED, (5, 5), 5)
+            pygame.draw.circle(image, ORANGE, (5, 5), 3)
+            return image
+
+        return self.register_image(('enemy_shot',), build)
+
+    def spawn(self, x, y, vx, vy, owner, image):
+        if self.count == self.capacity:
+            self.grow(self.capacity * 2)
+        i = self.count
+        self.count += 1
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.owner[i] = owner
+        self.image[i] = image
+        self.alive[i] = True
+        # Rect placement matches pygame's Rect(center=...) for the spawn point
+        self.left[i] = self.prev_left[i] = int(x) - self.widths[image] // 2
+        self.top[i] = self.prev_top[i] = int(y) - self.heights[image] // 2
+
+    def spawn_many(self, xs, ys, vxs, vys, owner, image):
+        """Vectorised spawn of many projectiles sharing an owner and image"""
+        n = len(xs)
+        if self.count + n > self.capacity:
+            self.grow(max(self.capacity * 2, self.count + n))
+        live = slice(self.count, self.count + n)
+        self.x[live] = xs
+        self.y[live] = ys
+        self.vx[live] = vxs
+        self.vy[live] = vys
+        self.owner[live] = owner
+        self.image[live] = image
+        self.alive[live] = True
+        self.left[live] = self.prev_left[live] = self.x[live].astype(np.int32) - self.widths[image] // 2
+        self.top[live] = self.prev_top[live] = self.y[live].astype(np.int32) - self.heights[image] // 2
+        self.count += n
+
+    def spawn_kunai(self, x, y, direction, angle, character_num):
+        image = self.kunai_image(character_num, direction, angle)
+        rad = math.radians(angle)
+        self.spawn(float(x), float(y), BULLET_SPEED * math.cos(rad) * direction,
+                   BULLET_SPEED * math.sin(rad) * -direction, self.OWNER_PLAYER, image)
+
+    def spawn_enemy_shot(self, x, y, direction):
+        self.spawn(float(x), float(y), self.ENEMY_SHOT_SPEED * direction, 0.0,
+                   self.OWNER_ENEMY, self.enemy_shot_image())
+
+    def clear(self):
+        self.count = 0
+
+    def snapshot(self):
+        n = self.count
+        self.prev_left[:n] = self.left[:n]
+        self.prev_top[:n] = self.top[:n]
+
+    def update(self, level_width, level_left=0):
+        """Move every projectile one tick, then drop dead and out-of-bounds ones"""
+        n = self.count
+        if n == 0:
+            return
+        x, y = self.x[:n], self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+        image = self.image[:n]
+        widths, heights = self.widths[image], self.heights[image]
+        # int() truncation toward zero, as the sprite version used for rect.center
+        left = self.left[:n]
+        top = self.top[:n]
+        left[:] = x.astype(np.int32) - widths // 2
+        top[:] = y.astype(np.int32) - heights // 2
+        alive = self.alive[:n]
+        alive &= (left + widths >= level_left) & (left <= level_width)
+        alive &= (top >= 0) & (top + heights <= SCREEN_HEIGHT)
+        self.compact()
+
+    def compact(self):
+        """Pack live slots to the front, keeping spawn order"""
+        n = self.count
+        keep = self.alive[:n]
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        for name in ('x', 'y', 'vx', 'vy', 'left', 'top', 'prev_left', 'prev_top', 'image', 'owner'):
+            column = getattr(self, name)
+            column[:live] = column[:n][keep]
+        self.alive[:live] = True
+        self.count = live
+
+    def kill(self, index):
+        self.alive[index] = False
+
+    def bounds(self, owner):
+        """Live indices of one owner and their rect edges (left, top, right, bottom)"""
+        n = self.count
+        index = np.flatnonzero(self.alive[:n] & (self.owner[:n] == owner))
+        image = self.image[index]
+        left, top = self.left[index], self.top[index]
+        return index, left, top, left + self.widths[image], top + self.heights[image]
+
+    def overlapping(self, rect, owner):
+        """Live indices of one owner whose rect overlaps rect, in spawn order"""
+        if self.count == 0:
+            return []
+        index, left, top, right, bottom = self.bounds(owner)
+        hit = (left < rect.right) & (right > rect.left) & (top < rect.bottom) & (bottom > rect.top)
+        return index[hit].tolist()
+
+    def counts(self):
+        owner = self.owner[:self.count]
+        players = int(np.count_nonzero(owner == self.OWNER_PLAYER))
+        return players, self.count - players
 
     def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
-        if 0 <= draw_rect.x <= SCREEN_WIDTH:
-            surface.blit(self.image, draw_rect)
+        surface.blits(self.visible_blits(camera), False)
+
+    def visible_blits(self, camera):
+        """(image, position) pairs for the on-screen projectiles, ready for Surface.blits"""
+        n = self.count
+        if n == 0:
+            return []
+        left, top = self.left[:n], self.top[:n]
+        if camera.alpha < 1.0:
+            prev_left, prev_top = self.prev_left[:n], self.prev_top[:n]
+            left = np.rint(prev_left + (left - prev_left) * camera.alpha).astype(np.int32)
+            top = np.rint(prev_top + (top - prev_top) * camera.alpha).astype(np.int32)
+        screen_x = left - camera.view_x
+        screen_y = top - camera.camera.y
+        visible = np.flatnonzero(self.alive[:n] & (screen_x >= 0) & (screen_x <= SCREEN_WIDTH))
+        images = self.images
+        return [(images[k], (sx, sy)) for k, sx, sy in
+                zip(self.image[visible].tolist(), screen_x[visible].tolist(),
+                    screen_y[visible].tolist())]
 
 
 class Enemy(pygame.sprite.Sprite):
     SPRITE_SIZE = (70, 70)
+    GENDERS = ['male', 'female']  # Zombie art sets
     
-    def __init__(self, x, y, enemy_type='soldier'):
+    def __init__(self, x, y, enemy_type='soldier', rng=random):
         super().__init__()
         self.enemy_type = enemy_type
+        self.rng = rng
         self.load_animations()
         
         if enemy_type == 'soldier':
@@ -552,9 +1744,10 @@ class Enemy(pygame.sprite.Sprite):
         
         self.image = self.walk_frames_left[0]
         self.rect = self.image.get_rect(topleft=(x, y))
+        self.prev_pos = self.rect.topleft
         self.vel_y = 0
         self.direction = -1
-        self.shoot_timer = random.randint(*self.shoot_interval)
+        self.shoot_timer = self.rng.randint(*self.shoot_interval)
         self.patrol_start = x - 100
         self.patrol_end = x + 100
         self.attacking = False
@@ -569,51 +1762,25 @@ class Enemy(pygame.sprite.Sprite):
         self.dead_anim = AnimatedSprite(self.dead_frames_left, 80)
 
     def load_animations(self):
-        """Load zombie animations"""
+        """Load zombie animations (shared through sprite_cache)"""
         # Randomly choose male or female zombie
-        gender = random.choice(['male', 'female'])
-        sprite_dir = os.path.join(SPRITES_DIR, f'enemy_{gender}')
-        
-        # Walk animation (10 frames)
-        self.walk_frames_left = []
-        for i in range(1, 11):
-            img = self.load_enemy_sprite(sprite_dir, f'Walk ({i}).png')
-            self.walk_frames_left.append(img)
-        self.walk_frames_right = [pygame.transform.flip(f, True, False) for f in self.walk_frames_left]
-        
-        # Idle animation (15 frames)
-        self.idle_frames_left = []
-        for i in range(1, 16):
-            img = self.load_enemy_sprite(sprite_dir, f'Idle ({i}).png')
-            self.idle_frames_left.append(img)
-        self.idle_frames_right = [pygame.transform.flip(f, True, False) for f in self.idle_frames_left]
-        
-        # Attack animation (8 frames)
-        self.attack_frames_left = []
-        for i in range(1, 9):
-            img = self.load_enemy_sprite(sprite_dir, f'Attack ({i}).png')
-            self.attack_frames_left.append(img)
-        self.attack_frames_right = [pygame.transform.flip(f, True, False) for f in self.attack_frames_left]
-        
-        # Dead animation (12 frames)
-        self.dead_frames_left = []
-        for i in range(1, 13):
-            img = self.load_enemy_sprite(sprite_dir, f'Dead ({i}).png')
-            self.dead_frames_left.append(img)
-        self.dead_frames_right = [pygame.transform.flip(f, True, False) for f in self.dead_frames_left]
-
-    def load_enemy_sprite(self, sprite_dir, filename):
-        """Load a single enemy sprite"""
-        path = os.path.join(sprite_dir, filename)
-        try:
-            img = pygame.image.load(path).convert_alpha()
-            return pygame.transform.scale(img, self.SPRITE_SIZE)
-        except:
-            surf = pygame.Surface(self.SPRITE_SIZE, pygame.SRCALPHA)
-            surf.fill(RED)
-            return surf
+        (self.walk_frames_left, self.walk_frames_right, self.idle_frames_left, self.idle_frames_right,
+         self.attack_frames_left, self.attack_frames_right,
+         self.dead_frames_left, self.dead_frames_right) = self.load_art(self.rng.choice(self.GENDERS))
 
-    def update(self, platforms, player_x):
+    @classmethod
+    def load_art(cls, gender):
+        """Walk (10), idle (15), attack (8) and dead (12) frames of one art set, each left then right"""
+        sprite_dir = os.path.join(SPRITES_DIR, f'enemy_{gender}')
+        frames = []
+        for pattern, count in (('Walk ({}).png', 10), ('Idle ({}).png', 15),
+                               ('Attack ({}).png', 8), ('Dead ({}).png', 12)):
+            for flip in (False, True):  # Sources face left
+                frames.append(sprite_cache.get_frames(sprite_dir, pattern, range(1, count + 1),
+                                                      cls.SPRITE_SIZE, flip, RED))
+        return frames
+
+    def update(self, level, player_x):
         # Handle death animation
         if self.dying:
             self.dead_anim.update()
@@ -636,18 +1803,20 @@ class Enemy(pygame.sprite.Sprite):
         
         # Apply gravity
         self.vel_y += GRAVITY
+        fall_from = self.rect.bottom
         self.rect.y += self.vel_y
         
-        # Platform collision
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_y > 0:
-                    self.rect.bottom = platform.rect.top
-                    self.vel_y = 0
+        # Platform collision; zombies climb onto any platform they overlap
+        # (they spawn at platform heights), so the sweep covers their body too
+        if self.vel_y > 0:
+            top = level.landing(self.rect, min(fall_from, self.rect.top))
+            if top is not None:
+                self.rect.bottom = top
+                self.vel_y = 0
         
         # Ground collision
-        if self.rect.bottom >= SCREEN_HEIGHT - 50:
-            self.rect.bottom = SCREEN_HEIGHT - 50
+        if self.rect.bottom >= SCREEN_HEIGHT - GROUND_HEIGHT:
+            self.rect.bottom = SCREEN_HEIGHT - GROUND_HEIGHT
             self.vel_y = 0
         
         # Update animation
@@ -685,120 +1854,310 @@ class Enemy(pygame.sprite.Sprite):
             return False  # Don't kill immediately, play death animation
         return False
 
-    def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
+    def screen_rect(self, camera):
+        draw_rect = camera.apply_sprite(self)
         if -50 <= draw_rect.x <= SCREEN_WIDTH + 50:
+            return draw_rect
+        return None
+
+    def draw(self, surface, camera):
+        draw_rect = self.screen_rect(camera)
+        if draw_rect:
             surface.blit(self.image, draw_rect)
 
 
-class EnemyBullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, direction):
-        super().__init__()
-        self.image = pygame.Surface((10, 10), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, RED, (5, 5), 5)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.direction = direction
-        self.speed = BULLET_SPEED - 4
+class Horde:
+    """Horde mode zombies in flat NumPy arrays, thousands at a time.
 
-    def update(self):
-        self.rect.x += self.speed * self.direction
-        if self.rect.right < 0 or self.rect.left > LEVEL_WIDTH:
-            self.kill()
-
-    def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
-        if 0 <= draw_rect.x <= SCREEN_WIDTH:
-            pygame.draw.circle(surface, RED, draw_rect.center, 5)
-            pygame.draw.circle(surface, ORANGE, draw_rect.center, 3)
+    The Enemy rules (chase within 300 px, patrol 100 px either side of the
+    spawn point, gravity, swept platform landing, walk and death animations)
+    run as array operations over every zombie at once, and only the ones on
+    screen become blits. Slots [0, count) are live, as in ProjectileSystem.
+    """
+    WIDTH, HEIGHT = Enemy.SPRITE_SIZE
+    CHASE_RANGE = 300
+    WALK_FRAMES = 10
+    DEAD_FRAMES = 12
+    ANIMATION_MS = 80  # Walk and death animations both step this often
+    DEATH_TICKS = DEAD_FRAMES * 5
+    ANIMATION_FRAMES = WALK_FRAMES + DEAD_FRAMES  # Per art set and facing: walk, then death
 
+    def __init__(self):
+        self.count = 0
+        self.images = self.load_images()
+        for name, dtype in (('x', np.float64), ('y', np.float64), ('vel_y', np.float64),
+                            ('speed', np.float64), ('elapsed', np.float64),
+                            ('patrol_start', np.float64), ('patrol_end', np.float64),
+                            ('prev_left', np.int32), ('prev_top', np.int32),
+                            ('direction', np.int8), ('health', np.int8), ('art', np.int8),
+                            ('frame', np.int16), ('death_timer', np.int16),
+                            ('dying', np.bool_), ('alive', np.bool_)):
+            setattr(self, name, np.zeros(0, dtype=dtype))
 
-class PowerUp(pygame.sprite.Sprite):
-    def __init__(self, x, y, power_type):
-        super().__init__()
+    @classmethod
+    def load_images(cls):
+        """Flat frame table, indexed by (art * 2 + facing right) * ANIMATION_FRAMES + frame"""
+        images = []
+        for gender in Enemy.GENDERS:
+            sprite_dir = os.path.join(SPRITES_DIR, f'enemy_{gender}')
+            for flip in (False, True):  # Sources face left
+                for pattern, count in (('Walk ({}).png', cls.WALK_FRAMES), ('Dead ({}).png', cls.DEAD_FRAMES)):
+                    images += sprite_cache.get_frames(sprite_dir, pattern, range(1, count + 1),
+                                                      Enemy.SPRITE_SIZE, flip, RED)
+        return images
+
+    def populate(self, level, count, rng):
+        """Spread count zombies over the level, three in ten of them heavies"""
+        generator = np.random.default_rng(rng.getrandbits(64))
+        x = generator.integers(400, level.width - 100, count).astype(np.float64)
+        y = generator.choice([SCREEN_HEIGHT - 90, 260, 330, 410], count).astype(np.float64)
+        heavy = generator.random(count) < 0.3
+        self.x, self.y = x, y
+        self.vel_y = np.zeros(count)
+        self.speed = np.where(heavy, ENEMY_SPEED * 0.6, ENEMY_SPEED)
+        self.health = np.where(heavy, 4, 2).astype(np.int8)
+        self.art = generator.integers(0, 2, count).astype(np.int8)
+        self.direction = np.full(count, -1, dtype=np.int8)
+        self.patrol_start, self.patrol_end = x - 100, x + 100
+        self.frame = np.zeros(count, dtype=np.int16)
+        self.elapsed = np.zeros(count)
+        self.death_timer = np.zeros(count, dtype=np.int16)
+        self.dying = np.zeros(count, dtype=np.bool_)
+        self.alive = np.ones(count, dtype=np.bool_)
+        self.prev_left, self.prev_top = x.astype(np.int32), y.astype(np.int32)
+        self.count = count
+
+    def snapshot(self):
+        n = self.count
+        self.prev_left[:n] = self.x[:n]
+        self.prev_top[:n] = self.y[:n]
+
+    def update(self, level, player_x):
+        n = self.count
+        if n == 0:
+            return
+        x, y, vel_y, direction = self.x[:n], self.y[:n], self.vel_y[:n], self.direction[:n]
+        dying = self.dying[:n]
+        walking = np.flatnonzero(~dying)
+
+        # Move towards the player if close, otherwise patrol
+        centerx = x[walking].astype(np.int32) + self.WIDTH // 2
+        near = np.abs(centerx - player_x) < self.CHASE_RANGE
+        direction[walking[near]] = np.where(player_x > centerx[near], 1, -1)
+        x[walking] += self.speed[walking] * direction[walking]
+        turn = walking[(x[walking] < self.patrol_start[walking]) | (x[walking] > self.patrol_end[walking])]
+        direction[turn] *= -1
+
+        # Gravity, then platforms (swept from the top, as Enemy does) and the ground
+        vel_y[walking] += GRAVITY
+        y[walking] += vel_y[walking]
+        falling = walking[vel_y[walking] > 0]
+        left = x[falling].astype(np.int32)
+        top = y[falling].astype(np.int32)
+        landing = level.landing_many(left, left + self.WIDTH, top, top + self.HEIGHT)
+        landed = landing >= 0
+        y[falling[landed]] = landing[landed] - self.HEIGHT
+        vel_y[falling[landed]] = 0
+        grounded = walking[y[walking] + self.HEIGHT >= SCREEN_HEIGHT - GROUND_HEIGHT]
+        y[grounded] = SCREEN_HEIGHT - GROUND_HEIGHT - self.HEIGHT
+        vel_y[grounded] = 0
+
+        # Animation: walk frames loop, death frames play out and the zombie goes
+        elapsed, frame = self.elapsed[:n], self.frame[:n]
+        elapsed += FRAME_MS
+        step = elapsed > self.ANIMATION_MS
+        elapsed[step] = 0
+        frame[step] += 1
+        frame[step & ~dying] %= self.WALK_FRAMES
+        frame[step & dying] %= self.DEAD_FRAMES
+        death_timer = self.death_timer[:n]
+        death_timer[dying] += 1
+        self.alive[:n] = death_timer < self.DEATH_TICKS
+        self.compact()
+
+    def compact(self):
+        """Drop finished death animations, keeping slot order"""
+        n = self.count
+        keep = self.alive[:n]
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        for name in ('x', 'y', 'vel_y', 'speed', 'elapsed', 'patrol_start', 'patrol_end', 'prev_left',
+                     'prev_top', 'direction', 'health', 'art', 'frame', 'death_timer', 'dying'):
+            column = getattr(self, name)
+            column[:live] = column[:n][keep]
+        self.alive[:live] = True
+        self.count = live
+
+    def remaining(self):
+        """Zombies not yet dying"""
+        return self.count - int(np.count_nonzero(self.dying[:self.count]))
+
+    def rects(self, index):
+        left = self.x[index].astype(np.int32)
+        top = self.y[index].astype(np.int32)
+        return left, top, left + self.WIDTH, top + self.HEIGHT
+
+    def touching(self, rect):
+        """Living zombies overlapping rect, in slot order"""
+        index = np.flatnonzero(~self.dying[:self.count])
+        left, top, right, bottom = self.rects(index)
+        hit = (left < rect.right) & (right > rect.left) & (top < rect.bottom) & (bottom > rect.top)
+        return index[hit].tolist()
+
+    def shoot(self, projectiles):
+        """Resolve player kunai hits as Game does for sprites; returns the centres of the killed"""
+        shots, left, top, right, bottom = projectiles.bounds(ProjectileSystem.OWNER_PLAYER)
+        if not shots.size or not self.count:
+            return []
+        # Only zombies inside the span of the kunai can be hit
+        x = self.x[:self.count]
+        index = np.flatnonzero(~self.dying[:self.count] & (x < right.max()) & (x + self.WIDTH > left.min()))
+        zl, zt, zr, zb = self.rects(index)
+        overlap = ((left[:, None] < zr) & (right[:, None] > zl) &
+                   (top[:, None] < zb) & (bottom[:, None] > zt))
+        killed = []
+        for row in np.flatnonzero(overlap.any(axis=1)).tolist():
+            for col in np.flatnonzero(overlap[row]).tolist():
+                i = index[col]
+                if not self.dying[i]:
+                    projectiles.kill(shots[row])
+                    self.health[i] -= 1
+                    if self.health[i] <= 0:
+                        sound_manager.play('enemy_die')
+                        self.dying[i] = True
+                        self.frame[i] = 0
+                        killed.append((int(zl[col]) + self.WIDTH // 2, int(zt[col]) + self.HEIGHT // 2))
+                    break
+        return killed
+
+    def visible_blits(self, camera):
+        """(image, position) pairs for the on-screen zombies, ready for Surface.blits"""
+        n = self.count
+        if n == 0:
+            return []
+        left, top = self.x[:n].astype(np.int32), self.y[:n].astype(np.int32)
+        if camera.alpha < 1.0:
+            prev_left, prev_top = self.prev_left[:n], self.prev_top[:n]
+            left = np.rint(prev_left + (left - prev_left) * camera.alpha).astype(np.int32)
+            top = np.rint(prev_top + (top - prev_top) * camera.alpha).astype(np.int32)
+        screen_x = left - camera.view_x
+        visible = np.flatnonzero((screen_x >= -50) & (screen_x <= SCREEN_WIDTH + 50))
+        image = ((self.art[visible] * 2 + (self.direction[visible] > 0)) * self.ANIMATION_FRAMES
+                 + self.frame[visible] + self.dying[visible] * self.WALK_FRAMES)
+        images = self.images
+        return [(images[k], (sx, sy)) for k, sx, sy in
+                zip(image.tolist(), screen_x[visible].tolist(), (top[visible] - camera.camera.y).tolist())]
+
+
+class PowerUp:
+    """A collectible; pooled (see powerup_pool), so all state is set in reset()"""
+    __slots__ = ('power_type', 'color', 'rect', 'prev_pos', 'float_offset')
+    COLORS = {'spread': ORANGE, 'rapid': YELLOW, 'health': GREEN, 'life': RED}
+
+    def __init__(self, x=0, y=0, power_type='health'):
+        self.rect = pygame.Rect(0, 0, 25, 25)
+        self.reset(x, y, power_type)
+
+    def reset(self, x, y, power_type):
         self.power_type = power_type
-        colors = {'spread': ORANGE, 'rapid': YELLOW, 'health': GREEN, 'life': RED}
-        self.color = colors.get(power_type, WHITE)
-        self.image = pygame.Surface((25, 25), pygame.SRCALPHA)
-        pygame.draw.rect(self.image, self.color, (0, 0, 25, 25), border_radius=5)
-        self.rect = self.image.get_rect(center=(x, y))
+        self.color = self.COLORS.get(power_type, WHITE)
+        self.rect.center = (x, y)
+        self.prev_pos = self.rect.topleft
         self.float_offset = 0
 
     def update(self):
         self.float_offset += 0.1
         self.rect.y += int(math.sin(self.float_offset) * 0.5)
 
-    def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
+    def screen_rect(self, camera):
+        draw_rect = camera.apply_sprite(self)
         if 0 <= draw_rect.x <= SCREEN_WIDTH:
+            return draw_rect
+        return None
+
+    def draw(self, surface, camera):
+        draw_rect = self.screen_rect(camera)
+        if draw_rect:
             pygame.draw.rect(surface, self.color, draw_rect, border_radius=5)
             # Letter indicator
-            font = pygame.font.Font(None, 20)
             letter = self.power_type[0].upper()
-            text = font.render(letter, True, BLACK)
+            text = text_cache.render(text_cache.font(20), letter, BLACK)
             surface.blit(text, (draw_rect.centerx - 5, draw_rect.centery - 7))
 
 
+powerup_pool = Pool(PowerUp)
+
+
 TILES_DIR = os.path.join(ASSETS_DIR, "tiles")
 
 
-class Platform(pygame.sprite.Sprite):
-    # Class-level tile cache
-    tile_images = {'graveyard': None, 'scifi': None}
-    
+class Platform:
+    """Platforms are plain rects in the level; this builds their tiled images.
+
+    Every platform of one size and theme looks the same, so the image is
+    built once and kept in the theme's asset group.
+    """
+
+    @staticmethod
+    def bounds(x, y, width, height):
+        """A platform's rect: at least one tile wide and 32 px deep"""
+        return pygame.Rect(x, y, max(width, 64), max(height, 32))
+
+    @classmethod
+    def get_image(cls, theme, width, height):
+        return asset_manager.get(AssetManager.theme(theme), ('platform', width, height),
+                                 lambda: cls.build_image(theme, width, height))
+
     @classmethod
     def load_tiles(cls, theme='graveyard'):
-        if cls.tile_images[theme] is None:
-            cls.tile_images[theme] = {
-                'left': None,
-                'middle': None,
-                'right': None,
-                'single': None
+        """The theme's tile set, kept in its asset group"""
+        return asset_manager.get(AssetManager.theme(theme), 'tiles', lambda: Platform.read_tiles(theme))
+
+    @staticmethod
+    def read_tiles(theme):
+        tiles = {
+            'left': None,
+            'middle': None,
+            'right': None,
+            'single': None
+        }
+        if theme == 'graveyard':
+            # Load graveyard tiles
+            tile_files = {
+                'left': 'Tile (1).png',
+                'middle': 'Tile (2).png', 
+                'right': 'Tile (3).png',
+                'single': 'Tile (6).png'
             }
-            
-            if theme == 'graveyard':
-                # Load graveyard tiles
-                tile_files = {
-                    'left': 'Tile (1).png',
-                    'middle': 'Tile (2).png', 
-                    'right': 'Tile (3).png',
-                    'single': 'Tile (6).png'
-                }
-                tile_dir = TILES_DIR
-            elif theme == 'scifi':
-                # Load sci-fi tiles
-                tile_files = {
-                    'left': 'Tile (1).png',
-                    'middle': 'Tile (2).png', 
-                    'right': 'Tile (3).png',
-                    'single': 'Tile (4).png'
-                }
-                tile_dir = os.path.join(TILES_DIR, 'scifi')
-            
-            for key, filename in tile_files.items():
-                path = os.path.join(tile_dir, filename)
-                try:
-                    img = pygame.image.load(path).convert_alpha()
-                    cls.tile_images[theme][key] = pygame.transform.scale(img, (64, 64))
-                except:
-                    pass
+            tile_dir = TILES_DIR
+        elif theme == 'scifi':
+            # Load sci-fi tiles
+            tile_files = {
+                'left': 'Tile (1).png',
+                'middle': 'Tile (2).png', 
+                'right': 'Tile (3).png',
+                'single': 'Tile (4).png'
+            }
+            tile_dir = os.path.join(TILES_DIR, 'scifi')
+        
+        for key, filename in tile_files.items():
+            path = os.path.join(tile_dir, filename)
+            try:
+                tiles[key] = asset_atlas.load(path, (64, 64))
+            except:
+                pass
+        return tiles
     
-    def __init__(self, x, y, width, height, theme='graveyard'):
-        super().__init__()
-        self.theme = theme
-        Platform.load_tiles(theme)
-        self.width = max(width, 64)
-        self.height = max(height, 32)
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.build_platform()
-
-    def build_platform(self):
+    @classmethod
+    def build_image(cls, theme, width, height):
         """Build platform from tiles"""
+        image = pygame.Surface((width, height), pygame.SRCALPHA)
         tile_size = 64
-        num_tiles = max(1, self.width // tile_size)
+        num_tiles = max(1, width // tile_size)
+        tiles = cls.load_tiles(theme)
         
         for i in range(num_tiles):
-            tiles = Platform.tile_images[self.theme]
             if tiles and tiles['middle']:
                 if num_tiles == 1:
                     tile = tiles['single'] or tiles['middle']
@@ -809,32 +2168,104 @@ class Platform(pygame.sprite.Sprite):
                 else:
                     tile = tiles['middle']
                 
-                # Scale tile to fit height
-                scaled = pygame.transform.scale(tile, (tile_size, self.height))
-                self.image.blit(scaled, (i * tile_size, 0))
+                # Scale tile to fit height (shared with every platform of this height)
+                scaled = transform_cache.get(tile, (tile_size, height))
+                image.blit(scaled, (i * tile_size, 0))
             else:
                 # Fallback to colored rectangles
-                color = BROWN if self.theme == 'graveyard' else GRAY
-                pygame.draw.rect(self.image, color, (i * tile_size, 0, tile_size, self.height))
+                color = BROWN if theme == 'graveyard' else GRAY
+                pygame.draw.rect(image, color, (i * tile_size, 0, tile_size, height))
+        return image
 
-    def draw(self, surface, camera):
-        draw_rect = camera.apply(self.rect)
-        if -self.rect.width <= draw_rect.x <= SCREEN_WIDTH:
-            surface.blit(self.image, draw_rect)
 
+class WorldLayer:
+    """Static level geometry (ground and platforms) baked into chunk surfaces.
 
-class Explosion(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
+    Chunks are WORLD_CHUNK_WIDTH columns of the level, rendered the first time
+    the camera reaches them and dropped once they are out of view again, so
+    drawing the world is a few blits and memory stays flat with level width.
+    """
+
+    def __init__(self, level):
+        self.level = level
+        self.chunks = {}  # chunk index -> (surface, y offset)
+
+    def bake(self, index):
+        x0 = index * WORLD_CHUNK_WIDTH
+        width = min(WORLD_CHUNK_WIDTH, self.level.width - x0)
+        platforms = [p for p in self.level.platforms_in(x0, x0 + width) if p.right > x0 and p.left < x0 + width]
+        # Only the band from the highest platform down to the ground is stored
+        top = min([p.top for p in platforms] + [SCREEN_HEIGHT - GROUND_HEIGHT])
+        chunk = pygame.Surface((width, SCREEN_HEIGHT - top), pygame.SRCALPHA)
+
+        for platform in platforms:
+            image = Platform.get_image(self.level.theme, platform.width, platform.height)
+            chunk.blit(image, (platform.x - x0, platform.y - top))
+
+        # Ground, tiled in world coordinates so it scrolls with the level
+        ground_y = SCREEN_HEIGHT - GROUND_HEIGHT - top
+        ground_tile = Platform.load_tiles(self.level.theme).get('middle')
+        if ground_tile:
+            tile_size = 64
+            scaled_tile = transform_cache.get(ground_tile, (tile_size, GROUND_HEIGHT))
+            for x in range(x0 - x0 % tile_size, x0 + width, tile_size):
+                chunk.blit(scaled_tile, (x - x0, ground_y))
+        else:
+            # Fallback
+            color = BROWN if self.level.theme == 'graveyard' else GRAY
+            pygame.draw.rect(chunk, color, (0, ground_y, width, GROUND_HEIGHT))
+
+        return convert_image(chunk), top
+
+    def warm(self, view_x=0):
+        """Bake the chunks visible from view_x ahead of the first draw"""
+        first = view_x // WORLD_CHUNK_WIDTH
+        for index in range(first, (view_x + SCREEN_WIDTH - 1) // WORLD_CHUNK_WIDTH + 1):
+            if index * WORLD_CHUNK_WIDTH < self.level.width and index not in self.chunks:
+                self.chunks[index] = self.bake(index)
+
+    def draw(self, surface, camera):
+        view_x = camera.view_x
+        first = max(0, view_x // WORLD_CHUNK_WIDTH)
+        last = (view_x + SCREEN_WIDTH - 1) // WORLD_CHUNK_WIDTH
+        for index in range(first, last + 1):
+            if index * WORLD_CHUNK_WIDTH >= self.level.width:
+                break
+            baked = self.chunks.get(index)
+            if baked is None:
+                baked = self.chunks[index] = self.bake(index)
+            chunk, top = baked
+            surface.blit(chunk, (index * WORLD_CHUNK_WIDTH - view_x, top - camera.camera.y))
+
+        # Keep one chunk either side of the view for small camera moves
+        for index in [i for i in self.chunks if i < first - 1 or i > last + 1]:
+            del self.chunks[index]
+
+
+class Explosion:
+    """A burst where a zombie died; pooled (see explosion_pool)"""
+    __slots__ = ('x', 'y', 'frame', 'max_frames')
+
+    def __init__(self, x=0, y=0):
+        self.reset(x, y)
+
+    def reset(self, x, y):
         self.x = x
         self.y = y
         self.frame = 0
         self.max_frames = 15
 
+    @property
+    def done(self):
+        return self.frame >= self.max_frames
+
     def update(self):
         self.frame += 1
-        if self.frame >= self.max_frames:
-            self.kill()
+
+    def screen_rect(self, camera):
+        radius = int(10 + self.frame * 2) + 1
+        pos = camera.apply(pygame.Rect(self.x, self.y, 1, 1))
+        return pygame.Rect(pos.x - radius, pos.y - radius, radius * 2 + 1, radius * 2 + 1)
 
     def draw(self, surface, camera):
         radius = int(10 + self.frame * 2)
@@ -845,10 +2276,19 @@ class Explosion(pygame.sprite.Sprite):
         pygame.draw.circle(surface, YELLOW, (pos.x, pos.y), radius // 2)
 
 
+explosion_pool = Pool(Explosion)
+
+
 class Background:
-    def __init__(self, level_width, theme='graveyard'):
+    # Backdrop, sky gradient, starfield and decoration images live in the theme's
+    # asset group, so a new level or a restart reuses them
+
+    def __init__(self, level_width, theme='graveyard', rng=random, wrap=False):
+        """wrap repeats the decorations every level_width pixels (endless mode)"""
         self.level_width = level_width
+        self.wrap = wrap
         self.theme = theme
+        self.rng = rng
         self.has_image = False
         
         # Try to load theme-specific background
@@ -860,19 +2300,85 @@ class Background:
             bg_path = None
             
         if bg_path:
-            try:
-                self.bg_image = pygame.image.load(bg_path).convert()
-                self.bg_image = pygame.transform.scale(self.bg_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-                self.has_image = True
-            except:
-                self.has_image = False
+            self.bg_image = asset_manager.get(AssetManager.theme(theme), 'backdrop',
+                                              lambda: self.load_backdrop(bg_path))
+            self.has_image = self.bg_image is not None
         
         # Load decorative objects
         self.decorations = []
         self.load_decorations()
+        self.decoration_layers = self.build_decoration_layers()
+
+    def build_decoration_layers(self):
+        """Bucket decorations by parallax factor, each bucket sorted by x.
+
+        Within one bucket a decoration's screen x is a fixed shift of its
+        world x, so the visible ones are a contiguous slice found by bisection.
+        Layers are ordered far to near so nearer decorations draw on top.
+        """
+        buckets = {}
+        for img, x, y, parallax in self.decorations:
+            factor = round(round(parallax / PARALLAX_STEP) * PARALLAX_STEP, 2)
+            buckets.setdefault(factor, []).append((x, y, img))
+        layers = []
+        for factor in sorted(buckets):
+            items = sorted(buckets[factor], key=lambda item: item[0])
+            layers.append((factor, [x for x, _, _ in items], items))
+        return layers
+
+    @staticmethod
+    def load_backdrop(path):
+        try:
+            return asset_atlas.load(path, (SCREEN_WIDTH, SCREEN_HEIGHT), alpha=False)
+        except:
+            return None
+
+    @classmethod
+    def get_sky_layer(cls, theme):
+        """Full-screen vertical gradient for a theme without a background image"""
+        return asset_manager.get(AssetManager.theme(theme), 'sky', lambda: cls.render_sky_layer(theme))
+
+    @staticmethod
+    def render_sky_layer(theme):
+        if theme == 'scifi':
+            # Sci-fi space background
+            base, span = (10, 20, 60), (30, 40, 50)
+        else:
+            # Dark graveyard sky
+            base, span = (30, 20, 50), (20, 30, 30)
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        for y in range(SCREEN_HEIGHT):
+            ratio = y / SCREEN_HEIGHT
+            color = tuple(int(b + s * ratio) for b, s in zip(base, span))
+            pygame.draw.line(layer, color, (0, y), (SCREEN_WIDTH, y))
+        return convert_image(layer, alpha=False)
+
+    @classmethod
+    def get_star_layer(cls):
+        """One screen width of stars over the upper half of the sky"""
+        return asset_manager.get(AssetManager.theme('scifi'), 'stars', cls.render_star_layer)
+
+    @staticmethod
+    def render_star_layer():
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT // 2), pygame.SRCALPHA)
+        for i in range(50):
+            x = (i * 137) % SCREEN_WIDTH
+            y = (i * 73) % (SCREEN_HEIGHT // 2)
+            pygame.draw.circle(layer, WHITE, (x, y), 1)
+        return convert_image(layer)
 
     def load_decorations(self):
-        """Load theme-specific decorations"""
+        """Place the theme's decorations across the level"""
+        images = asset_manager.get(AssetManager.theme(self.theme), 'decorations', self.load_decoration_images)
+        for img, h in images:
+            # Place multiple instances across the level
+            for i in range(self.level_width // 400):
+                x = self.rng.randint(i * 400, (i + 1) * 400)
+                self.decorations.append((img, x, SCREEN_HEIGHT - GROUND_HEIGHT - h, 0.7 + self.rng.random() * 0.3))
+
+    def load_decoration_images(self):
+        """Load theme-specific decorations as (image, height) pairs"""
+        images = []
         if self.theme == 'graveyard':
             decoration_files = [
                 ('Tree.png', 150, 200),
@@ -897,62 +2403,279 @@ class Background:
         for filename, w, h in decoration_files:
             path = os.path.join(sprite_dir, filename)
             try:
-                img = pygame.image.load(path).convert_alpha()
-                img = pygame.transform.scale(img, (w, h))
-                # Place multiple instances across the level
-                for i in range(self.level_width // 400):
-                    x = random.randint(i * 400, (i + 1) * 400)
-                    self.decorations.append((img, x, SCREEN_HEIGHT - 50 - h, 0.7 + random.random() * 0.3))
+                images.append((asset_atlas.load(path, (w, h)), h))
             except:
                 pass
+        return images
 
     def draw(self, surface, camera):
         if self.has_image:
             # Parallax scrolling with theme background
-            offset = int(camera.camera.x * 0.2) % SCREEN_WIDTH
+            offset = int(camera.view_x * 0.2) % SCREEN_WIDTH
             surface.blit(self.bg_image, (-offset, 0))
             surface.blit(self.bg_image, (SCREEN_WIDTH - offset, 0))
         else:
-            # Procedural background based on theme
-            if self.theme == 'graveyard':
-                # Dark graveyard sky
-                for y in range(SCREEN_HEIGHT):
-                    ratio = y / SCREEN_HEIGHT
-                    r = int(30 + 20 * ratio)
-                    g = int(20 + 30 * ratio)
-                    b = int(50 + 30 * ratio)
-                    pygame.draw.line(surface, (r, g, b), (0, y), (SCREEN_WIDTH, y))
-            elif self.theme == 'scifi':
-                # Sci-fi space background
-                for y in range(SCREEN_HEIGHT):
-                    ratio = y / SCREEN_HEIGHT
-                    r = int(10 + 30 * ratio)
-                    g = int(20 + 40 * ratio)
-                    b = int(60 + 50 * ratio)
-                    pygame.draw.line(surface, (r, g, b), (0, y), (SCREEN_WIDTH, y))
-                
-                # Add some stars
-                for i in range(50):
-                    x = (i * 137 + camera.camera.x * 0.1) % SCREEN_WIDTH
-                    y = (i * 73) % (SCREEN_HEIGHT // 2)
-                    pygame.draw.circle(surface, WHITE, (int(x), int(y)), 1)
-        
-        # Draw decorations with parallax
-        for img, x, y, parallax in self.decorations:
-            screen_x = x - camera.camera.x * parallax
-            if -200 <= screen_x <= SCREEN_WIDTH + 200:
-                surface.blit(img, (screen_x, y))
+            # Procedural background based on theme, from cached layers
+            surface.blit(self.get_sky_layer(self.theme), (0, 0))
+            if self.theme == 'scifi':
+                # Stars drift at a tenth of the camera speed, wrapping around
+                offset = int(camera.view_x * 0.1) % SCREEN_WIDTH
+                stars = self.get_star_layer()
+                surface.blit(stars, (offset, 0))
+                surface.blit(stars, (offset - SCREEN_WIDTH, 0))
+        
+        # Draw decorations with parallax: only the visible slice of each layer
+        for parallax, xs, items in self.decoration_layers:
+            shift = camera.view_x * parallax
+            if self.wrap:
+                shift %= self.level_width
+            first = bisect_left(xs, shift - 200)
+            last = bisect_right(xs, shift + SCREEN_WIDTH + 200)
+            for x, y, img in items[first:last]:
+                surface.blit(img, (x - shift, y))
+            if self.wrap:
+                # Across the seam the end of the strip leads into its start
+                period = self.level_width
+                for x, y, img in items[bisect_left(xs, shift - 200 + period):]:
+                    surface.blit(img, (x - period - shift, y))
+                for x, y, img in items[:bisect_right(xs, shift + SCREEN_WIDTH + 200 - period)]:
+                    surface.blit(img, (x + period - shift, y))
+
+
+class CollisionIndex:
+    """Which platforms overlap each COLLISION_CELL-wide column of a level.
+
+    Stored flat: the ids for column c are ids[starts[c]:starts[c + 1]], in
+    level order. Columns are counted from origin.
+    """
+
+    def __init__(self, starts, ids, origin=0, cell=COLLISION_CELL):
+        self.starts = starts
+        self.ids = ids
+        self.origin = origin
+        self.cell = cell
+
+    @classmethod
+    def build(cls, rects, x0, x1, cell=COLLISION_CELL):
+        """Index (x, y, w, h) rects over the columns from x0 to x1"""
+        columns = max(1, -(-(x1 - x0) // cell))
+        rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        first = np.clip((rects[:, 0] - x0) // cell, 0, columns - 1)
+        last = np.clip((rects[:, 0] + rects[:, 2] - 1 - x0) // cell, 0, columns - 1)
+        spans = last - first + 1
+        # One (column, id) pair per column a rect covers, grouped by column
+        ids = np.repeat(np.arange(len(rects)), spans)
+        steps = np.arange(len(ids)) - np.repeat(np.cumsum(spans) - spans, spans)
+        cols = np.repeat(first, spans) + steps
+        order = np.lexsort((ids, cols))
+        starts = np.zeros(columns + 1, dtype=np.uint32)
+        starts[1:] = np.cumsum(np.bincount(cols, minlength=columns))
+        return cls(starts, ids[order].astype(np.uint32), x0, cell)
+
+    def query(self, x0, x1):
+        """Ids of the platforms in the columns x0..x1 covers, in level order"""
+        columns = len(self.starts) - 1
+        first = max(0, (x0 - self.origin) // self.cell)
+        last = min(columns - 1, (x1 - 1 - self.origin) // self.cell)
+        if first > last:
+            return []
+        ids = self.ids[self.starts[first]:self.starts[last + 1]]
+        if last > first:
+            ids = np.unique(ids)  # A platform spanning columns is listed in each
+        return ids.tolist()
+
+    def columns(self, items):
+        """Per column, the tuple of items its ids refer to (for per-entity lookups)"""
+        ids = self.ids.tolist()
+        starts = self.starts.tolist()
+        return [tuple(items[i] for i in ids[start:end]) for start, end in zip(starts, starts[1:])]
+
+
+class LevelData:
+    """A level compiled from a designer's source file.
+
+    Source files are JSON: a theme, a width and lists of platforms
+    [x, y, w, h], enemy spawns [x, y, type] and power-ups [x, y, type].
+    The compiled .ncl file is a fixed header followed by flat int32
+    arrays and the collision index, so loading it is one read and no
+    per-platform objects.
+    """
+    MAGIC = b'NCLV'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBBxxIIIIII')  # magic, version, theme, width, cell, then counts
+    THEMES = ('graveyard', 'scifi')
+    ENEMY_TYPES = ('soldier', 'heavy', 'turret')
+    POWERUP_TYPES = ('spread', 'rapid', 'health', 'life')
+
+    def __init__(self, theme, width, platforms, enemies, powerups, index):
+        self.theme = theme
+        self.width = width
+        self.platforms = platforms  # (n, 4) x, y, w, h
+        self.enemies = enemies  # (n, 3) x, y, type
+        self.powerups = powerups  # (n, 3) x, y, type
+        self.index = index
+
+    @classmethod
+    def compile(cls, source):
+        """Check a parsed source file and build the level from it"""
+        theme = source.get('theme', 'graveyard')
+        if theme not in cls.THEMES:
+            raise ValueError(f"unknown theme {theme!r}; choose from {', '.join(cls.THEMES)}")
+        width = int(source.get('width', LEVEL_WIDTH))
+        if width < SCREEN_WIDTH:
+            raise ValueError(f"width must be at least {SCREEN_WIDTH}")
+
+        def table(key, types):
+            rows = []
+            for entry in source.get(key, []):
+                x, y, kind = entry
+                if kind not in types:
+                    raise ValueError(f"{key}: unknown type {kind!r}; choose from {', '.join(types)}")
+                rows.append((int(x), int(y), types.index(kind)))
+            return np.array(rows, dtype=np.int32).reshape(-1, 3)
+
+        rows = []
+        for x, y, w, h in source.get('platforms', []):
+            rows.append(tuple(Platform.bounds(int(x), int(y), int(w), int(h))))
+        platforms = np.array(rows, dtype=np.int32).reshape(-1, 4)
+        return cls(theme, width, platforms, table('enemies', cls.ENEMY_TYPES),
+                   table('powerups', cls.POWERUP_TYPES), CollisionIndex.build(platforms, 0, width))
+
+    def tobytes(self):
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self.THEMES.index(self.theme), self.width,
+                                  self.index.cell, len(self.platforms), len(self.enemies),
+                                  len(self.powerups), len(self.index.ids))
+        arrays = [array.astype('<i4') for array in (self.platforms, self.enemies, self.powerups)]
+        arrays += [self.index.starts.astype('<u4'), self.index.ids.astype('<u4')]
+        return header + b''.join(array.tobytes() for array in arrays)
+
+    @property
+    def checksum(self):
+        """CRC-32 of the compiled file, never 0; replays store it to insist on the same level"""
+        return zlib.crc32(self.tobytes()) or 1
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size:
+            raise ValueError(f"{path} is not a compiled level")
+        magic, version, theme, width, cell, platforms, enemies, powerups, ids = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} compiled level")
+        columns = max(1, -(-width // cell))
+        offset = cls.HEADER.size
+
+        def take(dtype, count, shape):
+            nonlocal offset
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+            offset += array.nbytes
+            return array
+
+        try:
+            platforms = take('<i4', platforms * 4, (-1, 4))
+            enemies = take('<i4', enemies * 3, (-1, 3))
+            powerups = take('<i4', powerups * 3, (-1, 3))
+            index = CollisionIndex(take('<u4', columns + 1, -1), take('<u4', ids, -1), 0, cell)
+        except ValueError:
+            raise ValueError(f"{path} is truncated")
+        return cls(cls.THEMES[theme], width, platforms, enemies, powerups, index)
+
+
+def compile_level(source_path, output_path=None):
+    """Compile a level source file; returns the output path and the level"""
+    with open(source_path) as f:
+        level = LevelData.compile(json.load(f))
+    output_path = output_path or os.path.splitext(source_path)[0] + '.ncl'
+    level.save(output_path)
+    return output_path, level
 
 
 class Level:
-    def __init__(self, level_num):
+    endless = False
+    left = 0  # Nothing exists left of this x (endless mode drops what is behind)
+    horde = None  # Horde mode keeps its zombies here instead of in enemies
+
+    def __init__(self, level_num, rng=random, data=None):
+        """data builds the level from a compiled LevelData instead of generating it"""
         self.level_num = level_num
+        self.rng = rng
+        self.data = data
         self.width = LEVEL_WIDTH + (level_num - 1) * 400
         self.theme = 'graveyard' if level_num == 1 else 'scifi'
-        self.platforms = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        self.powerups = pygame.sprite.Group()
-        self.generate_level()
+        self.platforms = []  # Rects; their images are shared per size (see Platform)
+        self.enemies = EnemyGroup()
+        self.powerups = []  # Pooled: see powerup_pool
+        if data:
+            self.load_level(data)
+        else:
+            self.generate_level()
+            self.index_platforms()
+
+    def index_platforms(self):
+        self.platform_array = np.array([tuple(p) for p in self.platforms], dtype=np.int32).reshape(-1, 4)
+        self.collision = CollisionIndex.build(self.platform_array, self.left, self.width)
+        self.columns = self.collision.columns(self.platforms)
+
+    def platforms_in(self, x0, x1):
+        """Platforms that may overlap world columns x0..x1, in level order"""
+        return [self.platforms[i] for i in self.collision.query(x0, x1)]
+
+    def landing(self, rect, fall_from):
+        """Top of the platform a rect falling from bottom fall_from lands on, or None.
+
+        Only the platforms in the columns the rect covers are tested. The
+        test is swept over the whole fall, so a drop faster than a platform
+        is deep still lands on it; when it crossed several, the highest wins.
+        """
+        index = self.collision
+        first = (rect.left - index.origin) // index.cell
+        last = (rect.right - 1 - index.origin) // index.cell
+        # Everything the rect's bottom edge passed: from just above fall_from down to where it is now
+        sweep = pygame.Rect(rect.left, fall_from - 1, rect.width, rect.bottom - fall_from + 1)
+        top = None
+        for column in self.columns[first if first > 0 else 0:last + 1]:
+            for platform in column:
+                if sweep.colliderect(platform) and (top is None or platform.top < top):
+                    top = platform.top
+        return top
+
+    def landing_many(self, left, right, fall_from, bottom):
+        """landing for arrays of rect edges; -1 where nothing was landed on"""
+        index = self.collision
+        columns = len(index.starts) - 1
+        tops = np.full(len(left), np.iinfo(np.int32).max, dtype=np.int32)
+        first = np.clip((left - index.origin) // index.cell, 0, columns - 1)
+        last = np.clip((right - 1 - index.origin) // index.cell, 0, columns - 1)
+        # One pass per column offset; rects narrower than a column need at most two
+        for offset in range(int((last - first).max(initial=-1)) + 1):
+            who = np.flatnonzero(first + offset <= last)
+            column = first[who] + offset
+            starts = index.starts[column].astype(np.int64)
+            counts = index.starts[column + 1].astype(np.int64) - starts
+            who = np.repeat(who, counts)
+            slots = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            px, py, pw, ph = self.platform_array[index.ids[slots]].T
+            hit = ((px < right[who]) & (left[who] < px + pw)
+                   & (fall_from[who] <= py + ph) & (bottom[who] > py))
+            np.minimum.at(tops, who[hit], py[hit])
+        return np.where(tops == np.iinfo(np.int32).max, -1, tops)
+
+    def load_level(self, data):
+        self.width = data.width
+        self.theme = data.theme
+        self.platforms = [pygame.Rect(rect) for rect in data.platforms.tolist()]
+        self.platform_array = data.platforms
+        self.collision = data.index
+        self.columns = data.index.columns(self.platforms)
+        for x, y, kind in data.enemies.tolist():
+            self.enemies.add(Enemy(x, y, LevelData.ENEMY_TYPES[kind], self.rng))
+        for x, y, kind in data.powerups.tolist():
+            self.powerups.append(powerup_pool.acquire(x, y, LevelData.POWERUP_TYPES[kind]))
 
     def generate_level(self):
         # Platform generation based on level
@@ -972,86 +2695,305 @@ class Level:
         
         for x, y, w, h in base_platforms:
             if x < self.width:
-                self.platforms.add(Platform(x, y, w, h, self.theme))
+                self.platforms.append(Platform.bounds(x, y, w, h))
         
         # Add more platforms for higher levels
         for i in range(self.level_num * 2):
-            x = random.randint(200, self.width - 200)
-            y = random.randint(200, 450)
-            self.platforms.add(Platform(x, y, random.randint(100, 180), 20, self.theme))
+            x = self.rng.randint(200, self.width - 200)
+            y = self.rng.randint(200, 450)
+            self.platforms.append(Platform.bounds(x, y, self.rng.randint(100, 180), 20))
         
         # Enemy generation
         enemy_count = 5 + self.level_num * 3
         for i in range(enemy_count):
-            x = random.randint(400, self.width - 100)
-            y = random.choice([SCREEN_HEIGHT - 90, 260, 330, 410])
+            x = self.rng.randint(400, self.width - 100)
+            y = self.rng.choice([SCREEN_HEIGHT - 90, 260, 330, 410])
             
             # Enemy type based on level
-            if self.level_num >= 3 and random.random() < 0.2:
+            if self.level_num >= 3 and self.rng.random() < 0.2:
                 enemy_type = 'turret'
-            elif self.level_num >= 2 and random.random() < 0.3:
+            elif self.level_num >= 2 and self.rng.random() < 0.3:
                 enemy_type = 'heavy'
             else:
                 enemy_type = 'soldier'
             
-            self.enemies.add(Enemy(x, y, enemy_type))
+            self.enemies.add(Enemy(x, y, enemy_type, self.rng))
         
         # Power-up generation
         powerup_types = ['spread', 'rapid', 'health', 'life']
         for i in range(2 + self.level_num):
-            x = random.randint(300, self.width - 100)
-            y = random.randint(200, 400)
-            self.powerups.add(PowerUp(x, y, random.choice(powerup_types)))
+            x = self.rng.randint(300, self.width - 100)
+            y = self.rng.randint(200, 400)
+            self.powerups.append(powerup_pool.acquire(x, y, self.rng.choice(powerup_types)))
+
+
+class EndlessLevel(Level):
+    """Endless mode: generated in seeded chunks just ahead of the camera, dropped behind it.
+
+    Each chunk draws from its own generator seeded by the level seed and
+    chunk index, so a chunk's contents do not depend on when it was
+    generated. Width grows as chunks are added and left follows the
+    dropped ones, so memory and per-frame cost stay flat however far the
+    player runs.
+    """
+    endless = True
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.chunks = set()  # Indices of the chunks currently generated
+        self.next_chunk = 0
+        # Chunks can bring in either art set at any point; decode both now, not mid-run
+        for gender in Enemy.GENDERS:
+            Enemy.load_art(gender)
+        super().__init__(1, random.Random(seed))
+
+    def generate_level(self):
+        self.width = 0
+        self.stream(0)
+
+    def stream(self, camera_x):
+        """Generate a chunk past the right of the view and drop those a chunk behind it"""
+        changed = False
+        while self.width < camera_x + SCREEN_WIDTH + ENDLESS_CHUNK_WIDTH:
+            self.generate_chunk(self.next_chunk)
+            self.chunks.add(self.next_chunk)
+            self.next_chunk += 1
+            self.width += ENDLESS_CHUNK_WIDTH
+            changed = True
+
+        behind = [index for index in self.chunks if (index + 2) * ENDLESS_CHUNK_WIDTH <= camera_x]
+        for index in behind:
+            self.chunks.discard(index)
+            self.left = max(self.left, (index + 1) * ENDLESS_CHUNK_WIDTH)
+        if behind:
+            # Platforms and power-ups stay inside their chunk, so position says which chunk they were in
+            self.platforms = [platform for platform in self.platforms if platform.left >= self.left]
+            dropped = [powerup for powerup in self.powerups if powerup.rect.centerx < self.left]
+            if dropped:
+                self.powerups = [powerup for powerup in self.powerups if powerup.rect.centerx >= self.left]
+                powerup_pool.release_all(dropped)
+            for enemy in [enemy for enemy in self.enemies if enemy.rect.right < self.left]:
+                enemy.kill()
+        if changed or behind:
+            # Only the live chunks are indexed, so the index stays small
+            self.index_platforms()
+
+    def generate_chunk(self, index):
+        rng = random.Random(self.seed * 1000003 + index)
+        x0 = index * ENDLESS_CHUNK_WIDTH
+        difficulty = index // 4  # Rises every few screens
+
+        # Platforms stay inside their chunk so dropping it leaves no half platforms
+        for i in range(3):
+            width = rng.randint(100, 180)
+            self.platforms.append(Platform.bounds(x0 + rng.randint(0, ENDLESS_CHUNK_WIDTH - width),
+                                                  rng.randint(250, 480), width, 20))
+
+        for i in range(min(1 + difficulty, 8) if index else 0):
+            x = x0 + rng.randint(0, ENDLESS_CHUNK_WIDTH - 70)
+            y = rng.choice([SCREEN_HEIGHT - 90, 260, 330, 410])
+            if difficulty >= 3 and rng.random() < 0.2:
+                enemy_type = 'turret'
+            elif difficulty >= 1 and rng.random() < 0.3:
+                enemy_type = 'heavy'
+            else:
+                enemy_type = 'soldier'
+            self.enemies.add(Enemy(x, y, enemy_type, rng))
+
+        if index and rng.random() < 0.35:
+            self.powerups.append(powerup_pool.acquire(x0 + rng.randint(100, ENDLESS_CHUNK_WIDTH - 100),
+                                                      rng.randint(200, 400),
+                                                      rng.choice(['spread', 'rapid', 'health', 'life'])))
+
+
+class HordeLevel(Level):
+    """Horde mode: a long level whose zombies all live in one array-backed Horde"""
+
+    def __init__(self, level_num, rng=random, size=HORDE_SIZE):
+        self.size = size
+        super().__init__(level_num, rng)
+
+    def generate_level(self):
+        self.width = max(self.width, HORDE_LEVEL_WIDTH)
+        super().generate_level()
+        self.enemies.empty()  # The horde takes the regular zombies' place
+        # Platforms carry on past the hand-placed ones at the start
+        for i in range(self.width // 300):
+            width = self.rng.randint(100, 180)
+            self.platforms.append(Platform.bounds(self.rng.randint(2300, self.width - 200),
+                                                  self.rng.randint(250, 480), width, 20))
+        self.horde = Horde()
+        self.horde.populate(self, self.size, self.rng)
+
+
+class LevelLoader:
+    """Builds the next level on a worker thread while the level-complete screen shows.
+
+    The worker draws from the game's generator in the same order as a
+    synchronous build, so levels come out identical either way. Nothing
+    else may draw from it until the worker is done: the level-complete
+    screen doesn't, and Game.restart() waits for the worker first.
+    """
+
+    def __init__(self, level_num, rng, horde=False):
+        self.level_num = level_num
+        self.rng = rng
+        self.horde = horde
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name=f"level-{level_num}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.result = self.build()
+        except Exception as e:
+            self.error = e
+        self.progress = 1.0
+
+    def build(self):
+        level = HordeLevel(self.level_num, self.rng) if self.horde else Level(self.level_num, self.rng)
+        self.progress = 0.5
+        background = Background(level.width, level.theme, self.rng)
+        # Warm the process-wide layers the first frame would otherwise build
+        if not background.has_image:
+            background.get_sky_layer(level.theme)
+            if level.theme == 'scifi':
+                background.get_star_layer()
+        self.progress = 0.75
+        world = WorldLayer(level)
+        world.warm()
+        return level, background, world
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
+    def get(self):
+        """The built (level, background, world); waits if the worker is still busy"""
+        self.thread.join()
+        if self.error:
+            raise self.error
+        return self.result
 
 
 class Game:
-    def __init__(self, character_num=1):
+    def __init__(self, character_num=1, input_source=None, surface=None, seed=None, rng=None,
+                 broadphase=BROADPHASE, bullet_hell=False, dirty_rects=False, endless=False, level_data=None,
+                 horde=False):
+        """surface=None runs headless: update() works, draw() does nothing.
+
+        level_data (a compiled LevelData) replaces the generated first level.
+        """
         self.character_num = character_num
+        self.broadphase = broadphase
+        self.bullet_hell = bullet_hell
+        self.dirty_rects = dirty_rects
+        self.endless = endless
+        self.level_data = level_data
+        self.horde = horde
+        self.ticks = 0
+        self.active_enemies = 0
+        self.awake_enemies = []  # Zombies updated last tick; the rest have not moved
+        self.input = input_source or KeyboardInput()
+        self.surface = surface
+        # Every random draw of a run comes from this generator, so a seed replays exactly
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = rng or random.Random(self.seed)
         self.level_num = 1
-        self.level = Level(self.level_num)
+        if endless:
+            self.level = EndlessLevel(self.rng.getrandbits(32))
+            self.background = Background(ENDLESS_BACKDROP_PERIOD, self.level.theme, self.rng, wrap=True)
+        elif horde:
+            self.level = HordeLevel(self.level_num, self.rng)
+            self.background = Background(self.level.width, self.level.theme, self.rng)
+        else:
+            self.level = Level(self.level_num, self.rng, level_data)
+            self.background = Background(self.level.width, self.level.theme, self.rng)
         self.player = Player(100, SCREEN_HEIGHT - 150, character_num)
         self.camera = Camera(self.level.width, SCREEN_HEIGHT)
-        self.background = Background(self.level.width, self.level.theme)
-        self.bullets = pygame.sprite.Group()
-        self.enemy_bullets = pygame.sprite.Group()
-        self.explosions = pygame.sprite.Group()
+        self.world = WorldLayer(self.level)
+        self.projectiles = ProjectileSystem()
+        self.explosions = []  # Pooled: see explosion_pool
         self.score = 0
         self.game_over = False
         self.level_complete = False
         self.paused = False
         self.return_to_menu = False
-        self.font = pygame.font.Font(None, 36)
-        self.big_font = pygame.font.Font(None, 72)
+        self.static_key = None  # What the static screen currently on display shows
+        # Dirty-rectangle mode: background and world at scene_view, and last frame's sprites
+        self.scene = None
+        self.scene_view = None
+        self.drawn_rects = None
+        self.hud_key = None
+        # Next level, built in the background once this one is complete
+        self.loader = None
+        self.pending_events = None  # Rest of the frame Enter was pressed in, while loading
+        self.font = text_cache.font(36)
+        self.big_font = text_cache.font(72)
+        freeze_heap()
         
         sound_manager.play_music()
 
+    def complete_level(self):
+        self.level_complete = True
+        self.loader = LevelLoader(self.level_num + 1, self.rng, self.horde)
+
     def next_level(self):
         self.level_num += 1
-        self.level = Level(self.level_num)
+        powerup_pool.release_all(self.level.powerups)
+        if self.loader:
+            self.level, self.background, self.world = self.loader.get()
+            self.loader = None
+        else:
+            self.level = HordeLevel(self.level_num, self.rng) if self.horde else Level(self.level_num, self.rng)
+            self.background = Background(self.level.width, self.level.theme, self.rng)
+            self.world = WorldLayer(self.level)
         self.camera = Camera(self.level.width, SCREEN_HEIGHT)
-        self.background = Background(self.level.width, self.level.theme)
         self.player.rect.x = 100
         self.player.rect.y = SCREEN_HEIGHT - 150
         self.player.weapon = 'normal'
-        self.bullets.empty()
-        self.enemy_bullets.empty()
-        self.explosions.empty()
+        self.projectiles.clear()
+        explosion_pool.release_all(self.explosions)
+        self.explosions = []
         self.level_complete = False
-
-    def handle_events(self):
-        for event in pygame.event.get():
+        self.awake_enemies = []
+        self.snapshot_positions()
+        freeze_heap()
+
+    def restart(self):
+        """Start over, keeping input, output, settings and the random stream"""
+        if self.loader:
+            # Game over and level complete can land on the same tick; let the
+            # worker finish its draws before the new game makes its own
+            self.loader.thread.join()
+        powerup_pool.release_all(self.level.powerups)
+        explosion_pool.release_all(self.explosions)
+        self.__init__(self.character_num, self.input, self.surface, self.seed, self.rng,
+                      self.broadphase, self.bullet_hell, self.dirty_rects, self.endless, self.level_data,
+                      self.horde)
+
+    def handle_events(self, events=None):
+        if events is None:
+            events = self.input.poll()
+        for i, event in enumerate(events):
             if event.type == pygame.QUIT:
                 return False
+            if event.type in WINDOW_EVENTS:
+                self.static_key = None  # Window contents may be lost; redraw
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.player.jump()
                 if event.key == pygame.K_z:
-                    bullets = self.player.shoot()
-                    for bullet in bullets:
-                        self.bullets.add(bullet)
+                    self.player.shoot(self.projectiles)
                 if event.key == pygame.K_r and self.game_over:
-                    self.__init__(self.character_num)
+                    self.restart()
                 if event.key == pygame.K_RETURN and self.level_complete:
+                    if self.loader and not self.loader.done:
+                        # Finish this frame once the level is built (see step)
+                        self.pending_events = events[i + 1:]
+                        return True
                     self.next_level()
                 if event.key == pygame.K_p:
                     self.paused = not self.paused
@@ -1060,60 +3002,193 @@ class Game:
                         self.return_to_menu = True
                     else:
                         self.paused = True
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                    self.static_key = None
+                if event.key == pygame.K_F4 and profiler.events:
+                    path = time.strftime("trace-%Y%m%d-%H%M%S.json")
+                    print(f"Wrote {profiler.export(path)} trace events to {path}")
         return True
 
+    def step(self):
+        """Advance one frame: consume input, then simulate"""
+        if self.pending_events is not None:
+            # Enter was pressed before the next level finished loading. No input
+            # is read until it has, then the frame resumes where it stopped, so
+            # recordings see the same frames however long the load took.
+            if not self.loader.done:
+                pygame.event.pump()
+                return True
+            events, self.pending_events = self.pending_events, None
+            self.next_level()
+            running = self.handle_events(events)
+        else:
+            running = self.handle_events()
+        self.update()
+        return running
+
+    @property
+    def loading(self):
+        return self.pending_events is not None
+
+    @property
+    def simulating(self):
+        return not (self.game_over or self.paused or self.level_complete)
+
+    def snapshot_positions(self):
+        """Remember where everything was, for render interpolation"""
+        self.camera.snapshot()
+        self.player.prev_pos = self.player.rect.topleft
+        self.projectiles.snapshot()
+        # Sleeping zombies never move, so only last tick's awake ones need it
+        for group in (self.awake_enemies, self.level.powerups):
+            for sprite in group:
+                sprite.prev_pos = sprite.rect.topleft
+        if self.level.horde:
+            self.level.horde.snapshot()
+
     def update(self):
-        if self.game_over or self.paused or self.level_complete:
+        if not self.simulating:
             return
         
-        self.player.update(self.level.platforms, self.level.width)
+        profiler.begin()
+        self.ticks += 1
+        self.snapshot_positions()
+        if self.level.endless:
+            self.level.stream(self.camera.camera.x)
+            self.camera.width = self.level.width
+            self.camera.left = self.level.left
+            profiler.lap('streaming', 'update')
+        self.player.update(self.level, self.input.get_pressed())
+        if self.player.rect.x < self.level.left:
+            self.player.rect.x = self.level.left
         self.camera.update(self.player)
-        
-        # Update bullets
-        for bullet in self.bullets:
-            bullet.update()
-        
-        # Update enemies
-        for enemy in list(self.level.enemies):
-            enemy_bullet = enemy.update(self.level.platforms, self.player.rect.centerx)
-            if enemy_bullet:
-                self.enemy_bullets.add(enemy_bullet)
-        
-        # Update enemy bullets
-        for bullet in self.enemy_bullets:
-            bullet.update()
+        profiler.lap('player', 'update')
+        
+        # Update bullets (player and enemy shots move together)
+        self.projectiles.update(self.level.width, self.level.left)
+        profiler.lap('bullets', 'update')
+        
+        # Update enemies near the camera; a shot comes back as (x, y, direction).
+        # The rest sleep (no physics, no animation) until the window reaches them,
+        # which depends only on the camera, so it replays exactly.
+        low = self.camera.camera.x - ENEMY_ACTIVE_MARGIN
+        high = self.camera.camera.x + SCREEN_WIDTH + ENEMY_ACTIVE_MARGIN
+        self.awake_enemies = self.level.enemies.awake(low, high)
+        self.active_enemies = len(self.awake_enemies)
+        for enemy in self.awake_enemies:
+            shot = enemy.update(self.level, self.player.rect.centerx)
+            if enemy.alive():
+                self.level.enemies.moved(enemy)
+            if shot:
+                self.projectiles.spawn_enemy_shot(*shot)
+        if self.level.horde:
+            # The horde is cheap enough in bulk to keep every zombie awake
+            self.level.horde.update(self.level, self.player.rect.centerx)
+            self.active_enemies += self.level.horde.count
+        if self.bullet_hell and self.ticks % BULLET_HELL_INTERVAL == 0:
+            self.fire_bullet_hell()
+        profiler.lap('enemies', 'update')
         
         # Update power-ups
         for powerup in self.level.powerups:
             powerup.update()
         
-        # Update explosions
+        # Update explosions; burnt-out ones go back to the pool
+        live = []
         for explosion in self.explosions:
             explosion.update()
+            if explosion.done:
+                explosion_pool.release(explosion)
+            else:
+                live.append(explosion)
+        self.explosions = live
+        profiler.lap('effects', 'update')
         
-        # Check bullet-enemy collisions
-        for bullet in list(self.bullets):
-            for enemy in list(self.level.enemies):
-                if not enemy.dying and bullet.rect.colliderect(enemy.rect):
-                    bullet.kill()
-                    enemy.take_damage()
-                    if enemy.dying:
-                        self.explosions.add(Explosion(enemy.rect.centerx, enemy.rect.centery))
-                        self.score += 100 * self.level_num
-                    break
-        
-        # Check enemy bullet-player collisions
-        for bullet in list(self.enemy_bullets):
-            if bullet.rect.colliderect(self.player.rect):
-                bullet.kill()
-                if self.player.take_damage(20):
-                    self.game_over = True
+        self.check_collisions()
+        profiler.lap('collisions', 'update')
+
+    def fire_bullet_hell(self):
+        """Stress mode: every living enemy fires a full ring of shots"""
+        centers = [enemy.rect.center for enemy in self.level.enemies if not enemy.dying]
+        if not centers:
+            return
+        centers = np.array(centers, dtype=np.float64)
+        # Rotate the ring a little each volley so the pattern spirals
+        angles = np.linspace(0, 2 * math.pi, BULLET_HELL_RING, endpoint=False) + self.ticks * 0.05
+        speed = ProjectileSystem.ENEMY_SHOT_SPEED
+        self.projectiles.spawn_many(
+            np.repeat(centers[:, 0], BULLET_HELL_RING), np.repeat(centers[:, 1], BULLET_HELL_RING),
+            np.tile(np.cos(angles) * speed, len(centers)), np.tile(np.sin(angles) * speed, len(centers)),
+            ProjectileSystem.OWNER_ENEMY, self.projectiles.enemy_shot_image())
+
+    def check_projectile_hits(self):
+        projectiles = self.projectiles
+        if projectiles.count == 0:
+            return
+
+        # Kunai vs enemies: one vectorised overlap matrix, then the few real hits
+        # are resolved in spawn order, first enemy wins, as a per-bullet loop would
+        index, left, top, right, bottom = projectiles.bounds(ProjectileSystem.OWNER_PLAYER)
+        if index.size:
+            if self.broadphase == 'grid':
+                # Projectiles are narrower than a column, so their two edges name every column they touch
+                columns = set((left // COLLISION_CELL).tolist()) | set(((right - 1) // COLLISION_CELL).tolist())
+                enemies = self.level.enemies.in_columns(columns)
+            else:
+                enemies = list(self.level.enemies)
+            enemies = [enemy for enemy in enemies if not enemy.dying]
+            if enemies:
+                rects = np.array([tuple(enemy.rect) for enemy in enemies], dtype=np.int32).reshape(-1, 4)
+                ex, ey = rects[:, 0], rects[:, 1]
+                overlap = ((left[:, None] < ex + rects[:, 2]) & (right[:, None] > ex) &
+                           (top[:, None] < ey + rects[:, 3]) & (bottom[:, None] > ey))
+                for row in np.flatnonzero(overlap.any(axis=1)).tolist():
+                    for col in np.flatnonzero(overlap[row]).tolist():
+                        enemy = enemies[col]
+                        if not enemy.dying:
+                            projectiles.kill(index[row])
+                            enemy.take_damage()
+                            if enemy.dying:
+                                self.level.enemies.dying.add(enemy)
+                                self.explosions.append(explosion_pool.acquire(enemy.rect.centerx,
+                                                                              enemy.rect.centery))
+                                self.score += 100 * self.level_num
+                            break
+
+        if self.level.horde:
+            for x, y in self.level.horde.shoot(projectiles):
+                self.explosions.append(explosion_pool.acquire(x, y))
+                self.score += 100 * self.level_num
+
+        # Enemy shots vs player; a respawn moves the player, so re-test after one
+        rect = self.player.rect.copy()
+        hits = projectiles.overlapping(rect, ProjectileSystem.OWNER_ENEMY)
+        while hits:
+            i = hits.pop(0)
+            projectiles.kill(i)
+            if self.player.take_damage(20):
+                self.game_over = True
+            if self.player.rect != rect:
+                rect = self.player.rect.copy()
+                hits = [j for j in projectiles.overlapping(rect, ProjectileSystem.OWNER_ENEMY) if j > i]
+
+    def check_collisions(self):
+        self.check_projectile_hits()
         
         # Check player-enemy collisions (melee damage)
-        for enemy in self.level.enemies:
+        if self.broadphase == 'grid':
+            enemies = self.level.enemies.in_range(self.player.rect.left, self.player.rect.right - 1)
+        else:
+            enemies = list(self.level.enemies)
+        for enemy in enemies:
             if not enemy.dying and self.player.rect.colliderect(enemy.rect):
                 if self.player.take_damage(15):  # Increased melee damage
                     self.game_over = True
+        if self.level.horde:
+            for _ in self.level.horde.touching(self.player.rect):
+                if self.player.take_damage(15):
+                    self.game_over = True
         
         # Check power-up collisions
         for powerup in list(self.level.powerups):
@@ -1125,48 +3200,69 @@ class Game:
                     self.player.health = min(self.player.max_health, self.player.health + 30)
                 elif powerup.power_type == 'life':
                     self.player.lives += 1
-                powerup.kill()
+                self.level.powerups.remove(powerup)
+                powerup_pool.release(powerup)
                 self.score += 50
         
         # Check level completion (only count alive enemies)
-        alive_enemies = [e for e in self.level.enemies if not e.dying]
-        if len(alive_enemies) == 0:
-            self.level_complete = True
-
+        remaining = self.level.enemies.living() or (self.level.horde and self.level.horde.remaining())
+        if not remaining and not self.level.endless:
+            self.complete_level()
+
+
+    @property
+    def idle(self):
+        """Nothing moves: paused, level complete or game over"""
+        return not self.simulating
+
+    def static_screen_key(self):
+        progress = int(self.loader.progress * 20) if self.loading else None
+        return (self.paused, self.level_complete, self.game_over, self.level_num, self.score,
+                profiler.enabled, progress)
+
+    def entity_counts(self):
+        player_shots, enemy_shots = self.projectiles.counts()
+        return {'enemies': self.enemy_count(), 'awake': self.active_enemies,
+                'kunai': player_shots, 'shots': enemy_shots,
+                'powerups': len(self.level.powerups), 'explosions': len(self.explosions),
+                'platforms': len(self.level.platforms), 'asset_kb': asset_manager.resident_bytes // 1024}
+
+    def enemy_count(self):
+        """Zombies in the level, dying ones included"""
+        return len(self.level.enemies) + (self.level.horde.count if self.level.horde else 0)
+
+    def draw(self, alpha=1.0):
+        """Render the world; alpha interpolates moving things between ticks"""
+        if self.surface is None:
+            return
+        gc_counts = gc_monitor.frame()  # Every frame, so the counts are never stale
+        if profiler.enabled:
+            profiler.frame({**self.entity_counts(), **gc_counts})
+        if self.idle:
+            # A static screen is composed and flipped once, then left on display
+            key = self.static_screen_key()
+            if key == self.static_key:
+                return
+            self.static_key = key
+            self.scene_view = None  # The overlay covers the frame the dirty mode would patch
+        else:
+            self.static_key = None
+        self.camera.set_alpha(alpha if self.simulating else 1.0)
+        if self.dirty_rects and self.simulating:
+            self.draw_dirty()
+            return
+        profiler.begin()
 
-    def draw(self):
         # Background
-        self.background.draw(screen, self.camera)
+        self.background.draw(self.surface, self.camera)
+        profiler.lap('background', 'draw')
         
-        # Ground with tiles
-        self.draw_ground()
+        # Ground and platforms, pre-baked
+        self.world.draw(self.surface, self.camera)
+        profiler.lap('platforms', 'draw')
         
-        # Platforms
-        for platform in self.level.platforms:
-            platform.draw(screen, self.camera)
-        
-        # Power-ups
-        for powerup in self.level.powerups:
-            powerup.draw(screen, self.camera)
-        
-        # Player
-        self.player.draw(screen, self.camera)
-        
-        # Bullets
-        for bullet in self.bullets:
-            bullet.draw(screen, self.camera)
-        
-        # Enemies
-        for enemy in self.level.enemies:
-            enemy.draw(screen, self.camera)
-        
-        # Enemy bullets
-        for bullet in self.enemy_bullets:
-            bullet.draw(screen, self.camera)
-        
-        # Explosions
-        for explosion in self.explosions:
-            explosion.draw(screen, self.camera)
+        self.draw_sprites(self.projectiles.visible_blits(self.camera), self.horde_blits())
+        profiler.lap('sprites', 'draw')
         
         # HUD
         self.draw_hud()
@@ -1174,81 +3270,357 @@ class Game:
         # Game states
         if self.paused:
             self.draw_overlay("PAUSED", "Press P to continue")
+        elif self.loading:
+            self.draw_overlay(f"LEVEL {self.level_num} COMPLETE!", f"Loading level {self.level_num + 1}...")
+            self.draw_progress(self.loader.progress)
         elif self.level_complete:
             self.draw_overlay(f"LEVEL {self.level_num} COMPLETE!", "Press ENTER for next level")
         elif self.game_over:
             self.draw_overlay("GAME OVER", f"Final Score: {self.score}  |  Press R to Restart")
+        profiler.lap('hud', 'draw')
+        if profiler.enabled:
+            profiler.draw(self.surface)
+            profiler.lap('profiler', 'draw')
         
         pygame.display.flip()
+        profiler.lap('flip', 'draw')
 
-    def draw_ground(self):
-        """Draw ground using tiles"""
-        Platform.load_tiles(self.level.theme)
-        ground_tile = Platform.tile_images[self.level.theme].get('middle')
+    def horde_blits(self):
+        return self.level.horde.visible_blits(self.camera) if self.level.horde else []
+
+    def visible_enemies(self):
+        """Zombies that may be on screen this frame, in draw order"""
+        # A column of slack covers the draw margin and the interpolation back to prev_pos
+        left = self.camera.view_x - COLLISION_CELL
+        return self.level.enemies.in_range(left, left + SCREEN_WIDTH + 2 * COLLISION_CELL)
+
+    def draw_sprites(self, shots, zombies=()):
+        # Power-ups
+        for powerup in self.level.powerups:
+            powerup.draw(self.surface, self.camera)
         
-        if ground_tile:
-            tile_size = 64
-            scaled_tile = pygame.transform.scale(ground_tile, (tile_size, 50))
-            for x in range(0, SCREEN_WIDTH + tile_size, tile_size):
-                screen.blit(scaled_tile, (x, SCREEN_HEIGHT - 50))
+        # Player
+        self.player.draw(self.surface, self.camera)
+        
+        # Bullets (enemy shots are drawn with them, under the enemies)
+        self.surface.blits(shots, False)
+        
+        # Enemies
+        for enemy in self.visible_enemies():
+            enemy.draw(self.surface, self.camera)
+        self.surface.blits(zombies, False)
+        
+        # Explosions
+        for explosion in self.explosions:
+            explosion.draw(self.surface, self.camera)
+
+    def draw_dirty(self):
+        """Redraw and push only the regions sprites and the HUD touched since last frame.
+
+        Background and world are kept in a scene surface; while the camera
+        holds still, old sprite rects are restored from it instead of redrawing
+        the whole frame. A camera move rebuilds the scene and flips everything.
+        """
+        camera = self.camera
+        profiler.begin()
+        if self.scene is None:
+            self.scene = convert_image(pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)), alpha=False)
+        view = (camera.view_x, camera.camera.y)
+        # The profiler panel is redrawn every frame, so it needs the full frame too
+        full = view != self.scene_view or self.drawn_rects is None or profiler.enabled
+        if view != self.scene_view:
+            self.background.draw(self.scene, camera)
+            profiler.lap('background', 'draw')
+            self.world.draw(self.scene, camera)
+            profiler.lap('platforms', 'draw')
+            self.scene_view = view
+
+        shots = self.projectiles.visible_blits(camera)
+        sprites = [*self.level.powerups, self.player, *self.visible_enemies(), *self.explosions]
+        rects = [rect for rect in (sprite.screen_rect(camera) for sprite in sprites) if rect]
+        zombies = self.horde_blits()
+        if len(rects) + len(shots) + len(zombies) <= DIRTY_RECT_LIMIT:
+            rects += [image.get_rect(topleft=pos) for image, pos in shots + zombies]
         else:
-            # Fallback
-            color = BROWN if self.level.theme == 'graveyard' else GRAY
-            pygame.draw.rect(screen, color, (0, SCREEN_HEIGHT - 50, SCREEN_WIDTH, 50))
+            rects = None
+            full = True
+
+        hud = (self.player.health, self.player.lives, self.score, self.level_label(),
+               self.player.weapon, self.enemy_count())
+        if full:
+            self.surface.blit(self.scene, (0, 0))
+            draw_hud = True
+        else:
+            dirty = rects + self.drawn_rects
+            draw_hud = hud != self.hud_key or any(rect.collidelist(HUD_RECTS) >= 0 for rect in dirty)
+            if draw_hud:
+                dirty += HUD_RECTS
+            dirty = merge_rects(dirty)
+            for rect in dirty:
+                self.surface.blit(self.scene, rect, rect)
+
+        self.draw_sprites(shots, zombies)
+        profiler.lap('sprites', 'draw')
+        if draw_hud:
+            self.draw_hud()
+            self.hud_key = hud
+        self.drawn_rects = rects
+        profiler.lap('hud', 'draw')
+        if profiler.enabled:
+            profiler.draw(self.surface)
+            profiler.lap('profiler', 'draw')
+
+        if full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        profiler.lap('flip', 'draw')
+
+    def level_label(self):
+        if self.level.endless:
+            return f"{self.player.rect.x // 50} m"  # Distance run, the endless score line
+        return f"Level: {self.level_num}"
 
     def draw_hud(self):
         # Health bar
-        pygame.draw.rect(screen, (50, 50, 50), (10, 10, 204, 24))
+        pygame.draw.rect(self.surface, (50, 50, 50), (10, 10, 204, 24))
         health_width = int(200 * (self.player.health / self.player.max_health))
         health_color = GREEN if self.player.health > 50 else (YELLOW if self.player.health > 25 else RED)
-        pygame.draw.rect(screen, health_color, (12, 12, health_width, 20))
-        pygame.draw.rect(screen, WHITE, (10, 10, 204, 24), 2)
+        pygame.draw.rect(self.surface, health_color, (12, 12, health_width, 20))
+        pygame.draw.rect(self.surface, WHITE, (10, 10, 204, 24), 2)
         
         # Lives
-        lives_text = self.font.render(f"Lives: {self.player.lives}", True, WHITE)
-        screen.blit(lives_text, (10, 40))
+        lives_text = text_cache.render(self.font, f"Lives: {self.player.lives}", WHITE)
+        self.surface.blit(lives_text, (10, 40))
         
         # Score
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (10, 70))
+        score_text = text_cache.render(self.font, f"Score: {self.score}", WHITE)
+        self.surface.blit(score_text, (10, 70))
         
         # Level
-        level_text = self.font.render(f"Level: {self.level_num}", True, WHITE)
-        screen.blit(level_text, (SCREEN_WIDTH - 120, 10))
+        level_text = text_cache.render(self.font, self.level_label(), WHITE)
+        self.surface.blit(level_text, (SCREEN_WIDTH - 120, 10))
         
         # Weapon indicator
-        weapon_text = self.font.render(f"Weapon: {self.player.weapon.upper()}", True, YELLOW)
-        screen.blit(weapon_text, (SCREEN_WIDTH - 180, 40))
+        weapon_text = text_cache.render(self.font, f"Weapon: {self.player.weapon.upper()}", YELLOW)
+        self.surface.blit(weapon_text, (SCREEN_WIDTH - 180, 40))
         
         # Enemies remaining
-        enemies_text = self.font.render(f"Enemies: {len(self.level.enemies)}", True, RED)
-        screen.blit(enemies_text, (SCREEN_WIDTH - 150, 70))
+        enemies_text = text_cache.render(self.font, f"Enemies: {self.enemy_count()}", RED)
+        self.surface.blit(enemies_text, (SCREEN_WIDTH - 150, 70))
         
         # Controls hint
-        controls = pygame.font.Font(None, 24).render(
-            "Arrows: Move | Space: Jump | Z: Shoot | P: Pause", True, WHITE)
-        screen.blit(controls, (SCREEN_WIDTH // 2 - controls.get_width() // 2, SCREEN_HEIGHT - 25))
+        controls = text_cache.render(text_cache.font(24),
+                                     "Arrows: Move | Space: Jump | Z: Shoot | P: Pause", WHITE)
+        self.surface.blit(controls, (SCREEN_WIDTH // 2 - controls.get_width() // 2, SCREEN_HEIGHT - 25))
 
     def draw_overlay(self, title, subtitle):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.fill(BLACK)
-        overlay.set_alpha(180)
-        screen.blit(overlay, (0, 0))
+        self.surface.blit(dim_overlay(180), (0, 0))
         
-        title_text = self.big_font.render(title, True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 
+        title_text = text_cache.render(self.big_font, title, WHITE)
+        self.surface.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 
                                  SCREEN_HEIGHT // 2 - 50))
         
-        sub_text = self.font.render(subtitle, True, WHITE)
-        screen.blit(sub_text, (SCREEN_WIDTH // 2 - sub_text.get_width() // 2, 
+        sub_text = text_cache.render(self.font, subtitle, WHITE)
+        self.surface.blit(sub_text, (SCREEN_WIDTH // 2 - sub_text.get_width() // 2, 
                                SCREEN_HEIGHT // 2 + 20))
 
 
-def main():
-    menu = MainMenu()
+    def draw_progress(self, fraction):
+        bar = pygame.Rect(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT // 2 + 70, 300, 16)
+        pygame.draw.rect(self.surface, (50, 50, 50), bar)
+        pygame.draw.rect(self.surface, GREEN, (bar.x, bar.y, int(bar.width * fraction), bar.height))
+        pygame.draw.rect(self.surface, WHITE, bar, 2)
+
+
+class Replay:
+    """A recorded run: seed, character and one input bitmask per frame.
+
+    On disk: a small fixed header followed by the zlib-compressed masks
+    (held keys barely change between frames, so runs compress very well).
+    level is the checksum of the level file the run started on, 0 for a
+    generated first level.
+    """
+    MAGIC = b'NCRP'
+    VERSION = 5  # 4: swept platform landing; 5: level file checksum in the header
+    HEADER = struct.Struct('<4sBQBBII')  # magic, version, seed, character, flags, level, frame count
+    FLAG_BULLET_HELL = 1 << 0
+    FLAG_ENDLESS = 1 << 1
+    FLAG_HORDE = 1 << 2
+
+    def __init__(self, seed, character_num, masks, bullet_hell=False, endless=False, horde=False, level=0):
+        self.seed = seed
+        self.character_num = character_num
+        self.masks = bytes(masks)
+        self.bullet_hell = bullet_hell
+        self.endless = endless
+        self.horde = horde
+        self.level = level
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            flags = ((self.FLAG_BULLET_HELL if self.bullet_hell else 0)
+                     | (self.FLAG_ENDLESS if self.endless else 0)
+                     | (self.FLAG_HORDE if self.horde else 0))
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.seed,
+                                     self.character_num, flags, self.level, len(self.masks)))
+            f.write(zlib.compress(self.masks, 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size:
+            raise ValueError(f"{path} is not a version {cls.VERSION} replay file")
+        magic, version, seed, character_num, flags, level, frames = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} replay file")
+        masks = zlib.decompress(data[cls.HEADER.size:])
+        if len(masks) != frames:
+            raise ValueError(f"{path} is truncated: expected {frames} frames, got {len(masks)}")
+        return cls(seed, character_num, masks, bool(flags & cls.FLAG_BULLET_HELL),
+                   bool(flags & cls.FLAG_ENDLESS), bool(flags & cls.FLAG_HORDE), level)
+
+
+def replay(path, max_speed=False, broadphase=BROADPHASE, dirty_rects=False, level_data=None, capture=None):
+    """Play a recorded run back; returns the game and per-frame step times.
+
+    max_speed skips rendering and the frame cap, so the frame times show the
+    simulation cost alone. There is one time per recorded frame, so slow
+    frames can be found by index; steps that only wait for the next level
+    to load are folded into the frame that pressed Enter. A run
+    recorded on a level file needs the same level_data to play back, and a
+    different one (or none) is rejected by checksum.
+    capture (a FrameCapture) gets every rendered frame, one per tick.
+    """
+    recording = Replay.load(path)
+    level = level_data.checksum if level_data else 0
+    if recording.level != level:
+        if not recording.level:
+            raise ValueError(f"{path} was recorded on a generated level; leave out --level")
+        raise ValueError(f"{path} was recorded on a level file (checksum {recording.level:08x}); "
+                         "pass that same file with --level")
+    surface = None if max_speed else create_screen()
+    game = Game(recording.character_num, ReplayInput(recording.masks), surface, recording.seed,
+                broadphase=broadphase, bullet_hell=recording.bullet_hell, dirty_rects=dirty_rects,
+                endless=recording.endless, level_data=level_data, horde=recording.horde)
+    frame_times = []
+
+    while not game.input.finished and not game.return_to_menu:
+        if max_speed and game.loading:
+            # Nothing to draw while the next level loads, so don't spin on it
+            game.loader.thread.join()
+        frame = game.input.frame
+        start = time.perf_counter()
+        running = game.step()
+        elapsed = time.perf_counter() - start
+        if game.input.frame != frame:
+            frame_times.append(elapsed)
+        elif frame_times:
+            frame_times[-1] += elapsed
+        if not running:
+            break
+        if not max_speed:
+            if pygame.event.get(pygame.QUIT):
+                break
+            game.draw()
+            if capture:
+                capture.capture(game.surface)
+            clock.tick(FPS)
+
+    return game, frame_times
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ninja Contra - Zombie Apocalypse")
+    parser.add_argument('--seed', type=int, help="seed for level generation (default: random)")
+    parser.add_argument('--record', metavar='FILE', help="record the inputs of each run to FILE")
+    parser.add_argument('--replay', metavar='FILE', help="play back a recorded run")
+    parser.add_argument('--max-speed', action='store_true',
+                        help="with --replay: simulate as fast as possible without rendering")
+    parser.add_argument('--broadphase', choices=['grid', 'brute'], default=BROADPHASE,
+                        help="collision broadphase; both give identical results (default: grid)")
+    parser.add_argument('--bullet-hell', action='store_true',
+                        help="stress mode: every zombie fires rings of shots")
+    parser.add_argument('--endless', action='store_true',
+                        help="endless mode: one level generated ahead of you for as long as you last")
+    parser.add_argument('--horde', action='store_true',
+                        help=f"horde mode: {HORDE_SIZE} zombies per level, simulated as arrays")
+    parser.add_argument('--level', metavar='FILE',
+                        help="play a compiled level file (.ncl) as the first level")
+    parser.add_argument('--compile-level', metavar='SOURCE', nargs='+',
+                        help="compile level source files (.json) to .ncl next to them and exit")
+    parser.add_argument('--capture', metavar='TARGET',
+                        help="save one frame per game tick: a directory for png, a file for raw, "
+                             "a command line for pipe")
+    parser.add_argument('--capture-format', choices=FrameCapture.FORMATS, default='png',
+                        help="png: numbered PNG files; raw: one RGB24 stream; pipe: RGB24 to the "
+                             "stdin of TARGET, e.g. \"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} "
+                             "-r {fps} -i - out.mp4\"; {fps} is the tick rate, and one frame is sent per "
+                             "tick (default: png)")
+    parser.add_argument('--capture-scale', type=int, default=1, metavar='N',
+                        help="capture every Nth pixel in each direction (default: 1)")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="only redraw and push changed screen regions while the camera is still")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="start with the profiler overlay on and write a Chrome trace to FILE on exit")
+    parser.add_argument('--build-atlas', action='store_true',
+                        help="pack all sprites, pre-scaled, into the asset atlas and exit")
+    parser.add_argument('--asset-budget', type=int, default=ASSET_BUDGET_BYTES // 1048576, metavar='MB',
+                        help="resident sprite/tile memory before unused themes are released "
+                             f"(default: {ASSET_BUDGET_BYTES // 1048576})")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="simulation speed multiplier, e.g. 4 to fast-forward (default: 1)")
+    parser.add_argument('--max-fps', type=int, default=RENDER_FPS,
+                        help=f"render frame cap, 0 for unlimited (default: {RENDER_FPS})")
+    args = parser.parse_args(argv)
+    if args.capture_scale < 1:
+        parser.error("--capture-scale must be at least 1")
+    return args
+
+
+def report_replay(game, frame_times):
+    total = sum(frame_times)
+    print(f"Replayed {len(frame_times)} frames in {total:.3f}s, final score {game.score}")
+    slowest = sorted(range(len(frame_times)), key=frame_times.__getitem__, reverse=True)[:5]
+    for frame in slowest:
+        print(f"  frame {frame}: {frame_times[frame] * 1000:.2f} ms")
+    print(f"GC: {'/'.join(map(str, gc_monitor.collections))} collections (gen 0/1/2), "
+          f"{gc_monitor.pause_ms:.1f} ms paused, longest {gc_monitor.longest_ms:.2f} ms")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    asset_manager.budget_bytes = args.asset_budget * 1048576
+    if args.build_atlas:
+        build_atlas()
+        pygame.quit()
+        return
+    if args.compile_level:
+        for source in args.compile_level:
+            path, level = compile_level(source)
+            print(f"{path}: {len(level.platforms)} platforms, {len(level.enemies)} enemies, "
+                  f"{len(level.powerups)} power-ups, {os.path.getsize(path)} bytes")
+        return
+    level_data = LevelData.load(args.level) if args.level else None
+    capture = FrameCapture(args.capture, args.capture_format, args.capture_scale) if args.capture else None
+    if args.replay:
+        report_replay(*replay(args.replay, args.max_speed, args.broadphase, args.dirty_rects, level_data, capture))
+        if capture:
+            capture.close()
+        pygame.quit()
+        return
+
+    if args.profile:
+        profiler.toggle()
+
+    screen = create_screen()
+    menu = MainMenu(screen)
     game = None
     state = 'menu'  # 'menu' or 'game'
     running = True
+    # The game simulates at a fixed FPS and renders as often as it can in between
+    timestep = FixedTimestep(FPS, args.time_scale)
     
     while running:
         if state == 'menu':
@@ -1256,24 +3628,70 @@ def main():
             if result == 'quit':
                 running = False
             elif result == 'start':
-                game = Game(menu.selected_character)
+                controls = InputRecorder(KeyboardInput()) if args.record else None
+                game = Game(menu.selected_character, controls, screen, args.seed,
+                            broadphase=args.broadphase, bullet_hell=args.bullet_hell,
+                            dirty_rects=args.dirty_rects, endless=args.endless, level_data=level_data,
+                            horde=args.horde)
+                asset_atlas.save()  # Keep what this start had to decode for next time
                 state = 'game'
+                timestep.reset()
             menu.draw()
+            clock.tick(MENU_FPS)
         
         elif state == 'game':
-            running = game.handle_events()
+            # Static screens only need to poll input, so the loop slows right down
+            frame_ms = clock.tick(IDLE_FPS if game.idle else args.max_fps)
+            ticks = 0
+            for _ in range(timestep.advance(frame_ms / 1000)):
+                running = game.step()
+                ticks += 1
+                if game.return_to_menu or not running:
+                    break
+            if game.return_to_menu or not running:
+                save_recording(game, args.record)
             if game.return_to_menu:
                 state = 'menu'
                 game = None
             else:
-                game.update()
-                game.draw()
-        
-        clock.tick(FPS)
+                game.draw(timestep.alpha)
+                if capture:
+                    # One frame per tick, whatever the render rate, so a capture plays back at FPS
+                    for _ in range(ticks):
+                        capture.capture(screen)
     
+    if capture:
+        capture.close()
+    if args.profile:
+        profiler.export(args.profile)
+    asset_atlas.save()
     pygame.quit()
     sys.exit()
 
 
+def build_atlas():
+    """Load every image the game uses at its in-game size, then write the atlas"""
+    screen = create_screen()
+    MainMenu(screen)
+    for character_num in (1, 2):
+        Player(0, 0, character_num)
+        ProjectileSystem.load_kunai(character_num)
+    for theme in ('graveyard', 'scifi'):
+        Platform.load_tiles(theme)
+        Background(LEVEL_WIDTH, theme, random.Random(0))
+    # Zombies pick male or female art at random; these seeds cover both
+    for seed in range(8):
+        Enemy(0, 0, 'soldier', random.Random(seed))
+    asset_atlas.save()
+    stats = asset_atlas.stats()
+    print(f"Atlas {ATLAS_PATH}: {stats['entries']} images, {stats['bytes'] / 1048576:.1f} MB")
+
+
+def save_recording(game, path):
+    if isinstance(game.input, InputRecorder):
+        Replay(game.seed, game.character_num, game.input.masks, game.bullet_hell, game.endless,
+               game.horde, game.level_data.checksum if game.level_data else 0).save(path)
+
+
 if __name__ == "__main__":
     main()